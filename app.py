@@ -2,12 +2,16 @@
 Streamlit interface for RAG system
 """
 import streamlit as st
+import hashlib
+import io
 import logging
-from typing import Dict, Any
-import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+import orjson
 
 from rag_system import RAGSystem
-from config import Config
+from core.config import Config
+from core.http_clients import run_async
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -36,23 +40,69 @@ def initialize_rag_system():
     
     return rag_system
 
-def display_document_info(doc: Dict[str, Any]):
-    """Displays document information"""
-    metadata = doc.get('metadata', {})
-    
-    col1, col2 = st.columns([3, 1])
+# Read-only RPCs are cached per RAG system instance: `_rag_system` is not hashed,
+# `system_id` (id of the cached resource) is the key
+@st.cache_data(ttl=60, show_spinner=False)
+def get_content_type_counts(_rag_system: RAGSystem, system_id: int) -> Dict[str, int]:
+    """Counts chunks per content type (the three Chroma reads run concurrently)"""
+    content_types = ("text", "table", "image")
+    with ThreadPoolExecutor(max_workers=len(content_types)) as executor:
+        counts = executor.map(_rag_system.vector_store.count_by_content_type, content_types)
+        return dict(zip(content_types, counts))
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_system_stats(_rag_system: RAGSystem, system_id: int) -> Dict[str, Any]:
+    """System statistics"""
+    return _rag_system.get_system_stats()
+
+def render_documents(docs: List[Dict[str, Any]], label: str) -> str:
+    """Builds one Markdown block for all documents (rendered with a single st.markdown)"""
+    similarities = [
+        None if doc.get('distance') is None else 1 - doc['distance']  # Convert distance to similarity
+        for doc in docs
+    ]
+    buf = io.StringIO()
+    for i, (doc, similarity) in enumerate(zip(docs, similarities), 1):
+        metadata = doc.get('metadata') or {}
+        buf.write(f"### {label} {i}\n")
+        buf.write(f"**Paper:** {metadata.get('title', 'Unknown')}  \n")
+        buf.write(f"**Authors:** {metadata.get('authors', 'Unknown')}  \n")
+        buf.write(f"**Section:** {metadata.get('section_id', 'N/A')}  \n")
+        buf.write(f"**Content type:** {metadata.get('content_type', 'text')}")
+        if similarity is not None:
+            buf.write(f"  \n**Similarity:** {similarity:.3f}")
+        buf.write(f"\n\n**Content:**\n\n{doc['content']}\n\n---\n\n")
+    return buf.getvalue()
+
+def input_hash(text: str, n_results: int, content_type: Optional[str]) -> str:
+    """Key of a question/search together with settings that affect its result"""
+    return hashlib.blake2b(f"{n_results}|{content_type}|{text}".encode(), digest_size=8).hexdigest()
+
+def display_answer(result: Dict[str, Any]):
+    """Displays generated answer with its sources"""
+    st.subheader("💡 Answer:")
+    st.write(result['answer'])
     
-    with col1:
-        st.write(f"**Paper:** {metadata.get('title', 'Unknown')}")
-        st.write(f"**Authors:** {metadata.get('authors', 'Unknown')}")
-        st.write(f"**Section:** {metadata.get('section_id', 'N/A')}")
-        st.write(f"**Content type:** {metadata.get('content_type', 'text')}")
+    # Display context
+    if result.get('context'):
+        st.subheader("📄 Sources used:")
+        st.markdown(render_documents(result['context'], "Source"))
     
-    with col2:
-        distance = doc.get('distance')
-        if distance is not None:
-            similarity = 1 - distance  # Convert distance to similarity
-            st.metric("Similarity", f"{similarity:.3f}")
+    # Additional information
+    with st.expander("ℹ️ Additional information"):
+        st.json({
+            "Context length": result.get('context_length', 0),
+            "Number of sources": len(result.get('context', [])),
+            "Model": result.get('system_info', {}).get('llm_model', 'N/A')
+        })
+
+def display_search_results(results: List[Dict[str, Any]]):
+    """Displays search results"""
+    if results:
+        st.subheader(f"Found {len(results)} documents:")
+        st.markdown(render_documents(results, "Document"))
+    else:
+        st.warning("No documents found")
 
 def main():
     """Main application function"""
@@ -92,7 +142,7 @@ def main():
         
         # System statistics
         st.header("📊 Statistics")
-        stats = rag_system.get_system_stats()
+        stats = get_system_stats(rag_system, id(rag_system))
         
         st.metric("Documents in DB", stats['vector_store'].get('document_count', 0))
         st.metric("Embedding model", stats['config']['embedding_model'].split('/')[-1])
@@ -102,6 +152,10 @@ def main():
         if st.button("🔄 Reset system"):
             with st.spinner("Resetting system..."):
                 rag_system.reset_system()
+                get_system_stats.clear()
+                get_content_type_counts.clear()
+                for key in ("last_question", "last_answer", "last_search", "last_results"):
+                    st.session_state.pop(key, None)
                 st.success("System reset!")
                 st.rerun()
     
@@ -121,41 +175,26 @@ def main():
         # Submit button
         if st.button("🚀 Get answer", type="primary"):
             if question.strip():
-                with st.spinner("Processing question..."):
-                    try:
-                        # Get answer
-                        result = rag_system.ask_question(
-                            question,
-                            n_results=n_results,
-                            content_type=content_type
-                        )
-                        
-                        # Display answer
-                        st.subheader("💡 Answer:")
-                        st.write(result['answer'])
-                        
-                        # Display context
-                        if result.get('context'):
-                            st.subheader("📄 Sources used:")
-                            
-                            for i, doc in enumerate(result['context'], 1):
-                                with st.expander(f"Source {i}"):
-                                    display_document_info(doc)
-                                    st.write("**Content:**")
-                                    st.write(doc['content'])
-                        
-                        # Additional information
-                        with st.expander("ℹ️ Additional information"):
-                            st.json({
-                                "Context length": result.get('context_length', 0),
-                                "Number of sources": len(result.get('context', [])),
-                                "Model": result.get('system_info', {}).get('llm_model', 'N/A')
-                            })
-                    
-                    except Exception as e:
-                        st.error(f"Error processing question: {e}")
+                # Same question with same settings: reuse stored answer, no new LLM call
+                key = input_hash(question, n_results, content_type)
+                if st.session_state.get("last_question") != key:
+                    with st.spinner("Processing question..."):
+                        try:
+                            # LLM call runs on the shared async loop thread, not the script thread
+                            st.session_state["last_answer"] = run_async(rag_system.aask_question(
+                                question,
+                                n_results=n_results,
+                                content_type=content_type
+                            ))
+                            st.session_state["last_question"] = key
+                        except Exception as e:
+                            st.error(f"Error processing question: {e}")
             else:
                 st.warning("Please enter a question")
+        
+        # Last answer survives reruns triggered by other widgets
+        if st.session_state.get("last_answer"):
+            display_answer(st.session_state["last_answer"])
     
     with tab2:
         st.header("Document search")
@@ -168,30 +207,24 @@ def main():
         
         if st.button("🔍 Find documents"):
             if search_query.strip():
-                with st.spinner("Searching documents..."):
-                    try:
-                        # Perform search
-                        results = rag_system.search_documents(
-                            search_query,
-                            n_results=n_results,
-                            content_type=content_type
-                        )
-                        
-                        if results:
-                            st.subheader(f"Found {len(results)} documents:")
-                            
-                            for i, doc in enumerate(results, 1):
-                                with st.expander(f"Document {i}"):
-                                    display_document_info(doc)
-                                    st.write("**Content:**")
-                                    st.write(doc['content'])
-                        else:
-                            st.warning("No documents found")
-                    
-                    except Exception as e:
-                        st.error(f"Search error: {e}")
+                key = input_hash(search_query, n_results, content_type)
+                if st.session_state.get("last_search") != key:
+                    with st.spinner("Searching documents..."):
+                        try:
+                            # Perform search
+                            st.session_state["last_results"] = rag_system.search_documents(
+                                search_query,
+                                n_results=n_results,
+                                content_type=content_type
+                            )
+                            st.session_state["last_search"] = key
+                        except Exception as e:
+                            st.error(f"Search error: {e}")
             else:
                 st.warning("Please enter a search query")
+        
+        if st.session_state.get("last_search"):
+            display_search_results(st.session_state["last_results"])
     
     with tab3:
         st.header("System analysis")
@@ -200,26 +233,25 @@ def main():
         st.subheader("📊 Statistics by content type")
         
         try:
-            text_docs = rag_system.vector_store.get_documents_by_content_type("text")
-            table_docs = rag_system.vector_store.get_documents_by_content_type("table")
-            image_docs = rag_system.vector_store.get_documents_by_content_type("image")
+            counts = get_content_type_counts(rag_system, id(rag_system))
             
             col1, col2, col3 = st.columns(3)
             
             with col1:
-                st.metric("Text chunks", len(text_docs))
+                st.metric("Text chunks", counts["text"])
             
             with col2:
-                st.metric("Tables", len(table_docs))
+                st.metric("Tables", counts["table"])
             
             with col3:
-                st.metric("Images", len(image_docs))
+                st.metric("Images", counts["image"])
             
             # Detailed statistics
             st.subheader("🔍 Detailed information")
             
-            stats = rag_system.get_system_stats()
-            st.json(stats)
+            stats = get_system_stats(rag_system, id(rag_system))
+            # orjson serializes in C; st.code skips st.json's stdlib round trip
+            st.code(orjson.dumps(stats, option=orjson.OPT_INDENT_2).decode(), language="json")
             
         except Exception as e:
             st.error(f"Error getting statistics: {e}")
@@ -0,0 +1,16 @@
+"""
+Compiles every Numba kernel once on tiny inputs so the first query pays no JIT cost.
+With cache=True the machine code lands in NUMBA_CACHE_DIR and later processes just load it.
+"""
+import numpy as np
+
+from core.rerank_kernels import mmr_select
+
+
+def warmup() -> None:
+    """Triggers compilation (or cache load) of all njit kernels"""
+    mmr_select(np.zeros(32, np.float32), np.zeros((4, 32), np.float32), 2, 0.5)
+
+
+if __name__ == "__main__":
+    warmup()
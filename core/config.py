@@ -1,21 +1,109 @@
 """
-Config for RAG agent
+Config for RAG agent and RAG system
 """
 import os
+import sys
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
 
+load_dotenv()
+
+# slots=True needs Python 3.10+
+_DATACLASS_OPTIONS = {"frozen": True, "slots": True} if sys.version_info >= (3, 10) else {"frozen": True}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Config:
     # Embedding model name for LlamaIndex
-    EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "text-embedding-ada-002")
+    EMBEDDING_MODEL: str = os.environ.get("EMBEDDING_MODEL", "text-embedding-ada-002")
     # LLM (OpenAI or local)
-    LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-3.5-turbo")
-    OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", None)
+    LLM_MODEL: str = os.environ.get("LLM_MODEL", "gpt-3.5-turbo")
+    OPENAI_API_KEY: Optional[str] = os.environ.get("OPENAI_API_KEY", None)
+    # Embedding dimension (1536 for text-embedding-ada-002)
+    EMBEDDING_DIM: int = int(os.environ.get("EMBEDDING_DIM", 1536))
     # Persistent index path for LlamaIndex
-    INDEX_PATH = os.environ.get("INDEX_PATH", "./data/index")
+    INDEX_PATH: str = os.environ.get("INDEX_PATH", "./data/index")
+    # Content-hash keyed embedding cache reused across index rebuilds
+    EMBEDDING_CACHE_PATH: str = os.environ.get("EMBEDDING_CACHE_PATH", "./data/embedding_cache")
+    EMBED_BATCH_SIZE: int = int(os.environ.get("EMBED_BATCH_SIZE", 256)) # texts per embedding API call
+    WRITE_BATCH_SIZE: int = int(os.environ.get("WRITE_BATCH_SIZE", 1024)) # nodes per vector store insert
+    # Vector backend: 'faiss' (in-memory HNSW) | 'diskann' (on-disk graph, pip install diskannpy)
+    BACKEND: str = os.environ.get("BACKEND", "faiss")
+    DISKANN_COMPLEXITY: int = int(os.environ.get("DISKANN_COMPLEXITY", 64))
+    DISKANN_BEAM_WIDTH: int = int(os.environ.get("DISKANN_BEAM_WIDTH", 4)) # I/O requests per search step, keep <= 8
+    # FAISS HNSW parameters
+    HNSW_M: int = int(os.environ.get("HNSW_M", 32)) # graph degree
+    EF_CONSTRUCTION: int = int(os.environ.get("EF_CONSTRUCTION", 200))
+    EF_SEARCH: int = int(os.environ.get("EF_SEARCH", 64)) # search breadth: higher = better recall, slower
+    QUANTIZATION: str = os.environ.get("QUANTIZATION", "int8") # at-rest vectors: 'fp32' | 'fp16' | 'bf16' | 'int8'
     # Directory with documents/corpus
-    CORPUS_PATH = os.environ.get("CORPUS_PATH", "./data/corpus")
+    CORPUS_PATH: str = os.environ.get("CORPUS_PATH", "./data/corpus")
+    # Worker processes for parsing corpus files (1 = sequential)
+    LOAD_WORKERS: int = int(os.environ.get("LOAD_WORKERS", os.cpu_count() or 1))
     # Maximum number of retrieved results
-    TOP_K = int(os.environ.get("TOP_K", 8))
+    TOP_K: int = int(os.environ.get("TOP_K", 8))
+    # Upper bound on retrieved context passed to the LLM (~12 KB fits gpt-3.5-turbo comfortably)
+    MAX_CONTEXT_BYTES: int = int(os.environ.get("MAX_CONTEXT_BYTES", 12000))
     # Reranker config
-    RERANKER_TYPE = os.environ.get("RERANKER_TYPE", "bge") # 'bge' | 'openai' | 'none'
-    K_RERANK_TOP = int(os.environ.get("K_RERANK_TOP", 4)) # how many (top-K) docs to keep after rerank
-    # (Optional: add rerank model path/api-key in env if needed)
+    RERANKER_TYPE: str = os.environ.get("RERANKER_TYPE", "bge") # 'bge' | 'openai' | 'none'
+    K_RERANK_TOP: int = int(os.environ.get("K_RERANK_TOP", 4)) # how many (top-K) docs to keep after rerank
+    RERANK_MODEL: str = os.environ.get("RERANK_MODEL", "BAAI/bge-reranker-base") # cross-encoder for 'bge'
+    # MMR diversification when no reranker is set (keeps K_RERANK_TOP docs)
+    USE_MMR: bool = os.environ.get("USE_MMR", "false").lower() == "true"
+    MMR_LAMBDA: float = float(os.environ.get("MMR_LAMBDA", 0.7)) # 1.0 = pure relevance, 0.0 = pure diversity
+    # (Optional: add rerank api-key in env if needed)
+    # Query cache for rag_search tool results
+    CACHE_SIZE: int = int(os.environ.get("CACHE_SIZE", 256)) # max cached queries (0 disables)
+    CACHE_TTL: float = float(os.environ.get("CACHE_TTL", 600)) # seconds before a cached result expires
+    # Window for coalescing concurrent query embeddings into one request (async path)
+    BATCH_WINDOW_MS: float = float(os.environ.get("BATCH_WINDOW_MS", 10))
+
+    # --- RAG system (ChromaDB + sentence-transformers) ---
+    # Local embedding model for the Chroma vector store
+    ST_EMBEDDING_MODEL: str = os.environ.get("ST_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    # INT8 ONNX export of ST_EMBEDDING_MODEL to embed with instead (see onnx_embedder.py); '' = PyTorch model
+    ONNX_EMBEDDING_MODEL_PATH: str = os.environ.get("ONNX_EMBEDDING_MODEL_PATH", "")
+    # torch.compile + CUDA graphs for the GPU embedding model (slower startup, faster small batches)
+    COMPILE_EMBEDDING_MODEL: bool = os.environ.get("COMPILE_EMBEDDING_MODEL", "false").lower() == "true"
+    # Chunking parameters (in cl100k_base tokens)
+    CHUNK_SIZE: int = int(os.environ.get("CHUNK_SIZE", 500))
+    CHUNK_OVERLAP: int = int(os.environ.get("CHUNK_OVERLAP", 50))
+    # Ingestion batches for the vector store: at most this many chunks / tokens per add call
+    ADD_BATCH_SIZE: int = int(os.environ.get("ADD_BATCH_SIZE", 128))
+    MAX_TOKENS_PER_BATCH: int = int(os.environ.get("MAX_TOKENS_PER_BATCH", 64000))
+    # initialize_system skips ingestion when the collection already holds this many chunks
+    MIN_DOCS: int = int(os.environ.get("MIN_DOCS", 1))
+    EMBED_CONCURRENCY: int = int(os.environ.get("EMBED_CONCURRENCY", 4)) # batches embedded at once by ainitialize_system
+    # RAG system storage: 'chroma' | 'faiss' (IVF-PQ, ~32x smaller vectors for 1M+ chunks, see faiss_ivfpq_store.py)
+    VECTOR_BACKEND: str = os.environ.get("VECTOR_BACKEND", "chroma")
+    FAISS_NLIST: int = int(os.environ.get("FAISS_NLIST", 4096)) # coarse clusters (capped at vectors / 39)
+    FAISS_PQ_M: int = int(os.environ.get("FAISS_PQ_M", 48)) # bytes per vector (1 byte per sub-quantizer)
+    FAISS_NPROBE: int = int(os.environ.get("FAISS_NPROBE", 32)) # clusters scanned per search: higher = better recall, slower
+    FAISS_TRAIN_SIZE: int = int(os.environ.get("FAISS_TRAIN_SIZE", 100_000)) # vectors the IVF-PQ codebooks are trained on
+    # Chroma HNSW index of a new collection; M and construction_ef are fixed once built
+    CHROMA_HNSW_M: int = int(os.environ.get("CHROMA_HNSW_M", 24))
+    CHROMA_CONSTRUCTION_EF: int = int(os.environ.get("CHROMA_CONSTRUCTION_EF", 128))
+    CHROMA_SEARCH_EF: int = int(os.environ.get("CHROMA_SEARCH_EF", 100)) # higher = better recall, slower
+    # 'none' | 'int8': also keep per-vector int8 codes next to the collection and search those
+    VECTOR_QUANTIZATION: str = os.environ.get("VECTOR_QUANTIZATION", "none")
+    # search_documents cache (size/TTL from CACHE_SIZE/CACHE_TTL): exact query, or a cached query this similar
+    SEARCH_CACHE_SIMILARITY: float = float(os.environ.get("SEARCH_CACHE_SIMILARITY", 0.97)) # > 1 disables the semantic match
+    # Prompt context for generate_answer, in cl100k_base tokens: per retrieved document and in total
+    MAX_DOC_TOKENS: int = int(os.environ.get("MAX_DOC_TOKENS", 400))
+    MAX_CONTEXT_TOKENS: int = int(os.environ.get("MAX_CONTEXT_TOKENS", 2000))
+    # Approximate HNSW hits re-ranked by exact cosine per search (0 = trust HNSW order)
+    RERANK_CANDIDATES: int = int(os.environ.get("RERANK_CANDIDATES", 50))
+    # Search parameters
+    TOP_K_RESULTS: int = int(os.environ.get("TOP_K_RESULTS", 5))
+    SIMILARITY_THRESHOLD: float = float(os.environ.get("SIMILARITY_THRESHOLD", 0.7))
+    # Data paths
+    DATA_DIR: str = os.environ.get("DATA_DIR", "data")
+    CORPUS_DIR: str = os.path.join(DATA_DIR, "corpus")
+    VECTOR_DB_PATH: str = os.path.join(DATA_DIR, "vector_db")
+    IMAGE_STORE_DIR: str = os.path.join(DATA_DIR, "images") # decoded section images, referenced by chunk metadata
+    # Chunk embeddings cached by content hash (one subdirectory per model), reused across rebuilds; '' disables
+    ST_EMBEDDING_CACHE_PATH: str = os.environ.get("ST_EMBEDDING_CACHE_PATH", os.path.join(DATA_DIR, "st_embedding_cache"))
+    # SQLite cache of LLM answers keyed by exact prompt; '' disables
+    LLM_CACHE_PATH: str = os.environ.get("LLM_CACHE_PATH", os.path.join(DATA_DIR, "llm_cache.db"))
+    # Vector database settings
+    COLLECTION_NAME: str = os.environ.get("COLLECTION_NAME", "arxiv_papers")
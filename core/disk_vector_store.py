@@ -0,0 +1,163 @@
+"""
+DiskANN-backed vector store for corpora that do not fit in RAM (pip install diskannpy)
+"""
+import os
+from typing import Any, List, Optional
+
+import numpy as np
+import orjson
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+_IDS_FILE = "node_ids.json"
+_REF_DOC_IDS_FILE = "ref_doc_ids.json"
+# Build input kept next to the graph: the static index cannot be updated, so adds/deletes rebuild from it
+_VECTORS_FILE = "vectors.npy"
+
+
+class DiskANNVectorStore(BasePydanticVectorStore):
+    """
+    Static on-disk graph index. Vectors passed to `add` are buffered and the index is
+    built once (on persist or first query); queries read graph pages from SSD.
+    The graph itself is immutable: an `add` or `delete` after the build re-queues every
+    vector, and the index is rebuilt on the next persist or query.
+    """
+
+    stores_text: bool = False
+    index_directory: str
+    complexity: int = 64
+    graph_degree: int = 32
+    beam_width: int = 4 # keep <= 8, wider beams inflate tail latency
+    num_threads: int = 8
+    search_memory_maximum: float = 2.0 # GB of RAM for the PQ-compressed vectors
+    build_memory_maximum: float = 8.0
+
+    _node_ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _pending: List[List[float]] = PrivateAttr(default_factory=list)
+    _index: Any = PrivateAttr(default=None)
+    # Set by add/delete, cleared by _build
+    _stale: bool = PrivateAttr(default=False)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "DiskANNVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return self._index
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        self._requeue()
+        for node in nodes:
+            self._pending.append(node.get_embedding())
+            self._node_ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id)
+        self._stale = True
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._requeue()
+        keep = [i for i, doc_id in enumerate(self._ref_doc_ids) if doc_id != ref_doc_id]
+        if len(keep) == len(self._node_ids):
+            return
+        self._pending = [self._pending[i] for i in keep]
+        self._node_ids = [self._node_ids[i] for i in keep]
+        self._ref_doc_ids = [self._ref_doc_ids[i] for i in keep]
+        self._stale = True
+
+    def _requeue(self) -> None:
+        """Moves the built index's vectors back into the pending buffer, so a change triggers a rebuild"""
+        if self._index is None:
+            return
+        vectors_path = os.path.join(self.index_directory, _VECTORS_FILE)
+        if not os.path.exists(vectors_path):
+            raise ValueError(f"{self.index_directory} was built without {_VECTORS_FILE}, rebuild the index to change it")
+        self._pending = list(np.load(vectors_path))
+        self._index = None
+
+    def _build(self) -> None:
+        import diskannpy
+
+        os.makedirs(self.index_directory, exist_ok=True)
+        self._write_ids()
+        self._stale = False
+        if not self._pending:
+            # Everything was deleted: nothing to build, queries return no hits
+            self._index = None
+            return
+        data = np.asarray(self._pending, dtype=np.float32)
+        np.save(os.path.join(self.index_directory, _VECTORS_FILE), data)
+        diskannpy.build_disk_index(
+            data=data,
+            distance_metric="mips",
+            index_directory=self.index_directory,
+            complexity=self.complexity,
+            graph_degree=self.graph_degree,
+            search_memory_maximum=self.search_memory_maximum,
+            build_memory_maximum=self.build_memory_maximum,
+            num_threads=self.num_threads,
+        )
+        self._pending = []
+        self._open()
+
+    def _write_ids(self) -> None:
+        with open(os.path.join(self.index_directory, _IDS_FILE), "wb") as f:
+            f.write(orjson.dumps(self._node_ids))
+        with open(os.path.join(self.index_directory, _REF_DOC_IDS_FILE), "wb") as f:
+            f.write(orjson.dumps(self._ref_doc_ids))
+
+    def _open(self) -> None:
+        import diskannpy
+
+        self._index = diskannpy.StaticDiskIndex(
+            index_directory=self.index_directory,
+            num_threads=self.num_threads,
+            num_nodes_to_cache=0,
+        )
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if self._stale:
+            self._build()
+        if self._index is None or query.query_embedding is None:
+            return VectorStoreQueryResult(nodes=None, similarities=[], ids=[])
+
+        k = min(query.similarity_top_k, len(self._node_ids))
+        response = self._index.search(
+            np.asarray(query.query_embedding, dtype=np.float32),
+            k_neighbors=k,
+            complexity=max(self.complexity, k),
+            beam_width=self.beam_width,
+        )
+        ids, similarities = [], []
+        for row, distance in zip(response.identifiers, response.distances):
+            if 0 <= row < len(self._node_ids):
+                ids.append(self._node_ids[row])
+                similarities.append(-float(distance)) # mips distance is the negated inner product
+        return VectorStoreQueryResult(similarities=similarities, ids=ids)
+
+    def persist(self, persist_path: str, fs: Optional[Any] = None) -> None:
+        # Index files already live in index_directory; only build if adds/deletes are pending
+        if self._stale:
+            self._build()
+
+    @classmethod
+    def from_index_directory(cls, index_directory: str, **kwargs: Any) -> "DiskANNVectorStore":
+        """Opens a previously built index"""
+        store = cls(index_directory=index_directory, **kwargs)
+        with open(os.path.join(index_directory, _IDS_FILE), "rb") as f:
+            store._node_ids = orjson.loads(f.read())
+        ref_doc_ids_path = os.path.join(index_directory, _REF_DOC_IDS_FILE)
+        if os.path.exists(ref_doc_ids_path):
+            with open(ref_doc_ids_path, "rb") as f:
+                store._ref_doc_ids = orjson.loads(f.read())
+        else:
+            store._ref_doc_ids = [None] * len(store._node_ids)
+        if store._node_ids:
+            store._open()
+        return store
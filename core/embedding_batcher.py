@@ -0,0 +1,61 @@
+"""
+Coalesces concurrent query embedding requests into batched API calls
+"""
+import asyncio
+from typing import List, Optional
+
+
+class EmbeddingBatcher:
+    """
+    Collects queries arriving within `window_ms` and embeds them with a single
+    `aget_text_embedding_batch` call. Each caller awaits its own future.
+    """
+
+    def __init__(self, embedding, window_ms: float = 10.0, max_batch: int = 64):
+        self.embedding = embedding
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _ensure_worker(self) -> None:
+        # Worker and queue are bound to the running loop (asyncio.run creates a new one per call)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._embed_worker())
+
+    async def embed(self, query: str) -> List[float]:
+        """Returns embedding for query, batched with other in-flight queries"""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((query, future))
+        return await future
+
+    async def _embed_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _ in batch]
+            try:
+                embeddings = await self.embedding.aget_text_embedding_batch(queries, show_progress=False)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
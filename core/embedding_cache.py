@@ -0,0 +1,76 @@
+"""
+Disk-backed embedding cache: fp32 vectors in a flat memmap file, content hash -> row in SQLite
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# SQLite default limit on bound parameters per statement
+_SQL_BATCH = 900
+
+
+class EmbeddingCache:
+    """Maps blake2b(text) to a row of `embeddings.f32` so unchanged texts are never re-embedded"""
+
+    def __init__(self, cache_dir: str, dim: int):
+        self.dim = dim
+        os.makedirs(cache_dir, exist_ok=True)
+        self.vectors_path = os.path.join(cache_dir, "embeddings.f32")
+        self.db_path = os.path.join(cache_dir, "embeddings.sqlite")
+        # Appends compute their first row from the file size, so they must not interleave
+        self._write_lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL") # persistent; readers do not block batched writes
+            conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+    def _row_count(self) -> int:
+        if not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (4 * self.dim)
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Returns cached vectors for the given hashes (misses are absent)"""
+        rows: Dict[str, int] = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(hashes), _SQL_BATCH):
+                batch = list(hashes[start:start + _SQL_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows.update(conn.execute(
+                    f"SELECT hash, row FROM embeddings WHERE hash IN ({placeholders})", batch
+                ).fetchall())
+        n_rows = self._row_count()
+        if not rows or n_rows == 0:
+            return {}
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        return {h: np.array(vectors[row]) for h, row in rows.items() if row < n_rows}
+
+    def put_many(self, hashes: Sequence[str], vectors: List[List[float]]) -> None:
+        """Appends vectors to the memmap file and records their rows"""
+        if not hashes:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        if array.shape != (len(hashes), self.dim):
+            raise ValueError(f"Expected embeddings of shape {(len(hashes), self.dim)}, got {array.shape}")
+        with self._write_lock:
+            first_row = self._row_count()
+            with open(self.vectors_path, "ab") as f:
+                f.write(array.tobytes())
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, row) VALUES (?, ?)",
+                    [(h, first_row + i) for i, h in enumerate(hashes)]
+                )
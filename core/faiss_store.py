@@ -0,0 +1,55 @@
+"""
+FAISS HNSW vector store for the LlamaIndex index (fp32, or fp16/bf16/int8 scalar-quantized)
+"""
+import faiss
+import numpy as np
+from llama_index.vector_stores.faiss import FaissVectorStore
+
+from core.config import Config
+
+# Scalar quantizers by at-rest precision (QT_bf16 only exists in newer FAISS, fall back to fp16)
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "bf16": getattr(faiss.ScalarQuantizer, "QT_bf16", faiss.ScalarQuantizer.QT_fp16),
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+class HNSWFaissVectorStore(FaissVectorStore):
+    """FaissVectorStore that trains a quantized index on the first inserted batch"""
+
+    def add(self, nodes, **add_kwargs):
+        faiss_index = self._faiss_index
+        if nodes and not faiss_index.is_trained:
+            # SQ only needs per-dimension min/max, the first batch is enough
+            faiss_index.train(np.array([n.get_embedding() for n in nodes], dtype="float32"))
+        return super().add(nodes, **add_kwargs)
+
+
+def _set_ef_search(faiss_index, ef_search: int) -> None:
+    hnsw = getattr(faiss_index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search
+
+
+def create_vector_store(config: Config) -> HNSWFaissVectorStore:
+    """Creates an empty HNSW store (inner product == cosine for normalized OpenAI vectors)"""
+    dim = config.EMBEDDING_DIM
+    if config.QUANTIZATION == "fp32":
+        faiss_index = faiss.IndexHNSWFlat(dim, config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    elif config.QUANTIZATION in _SQ_TYPES:
+        # Distances are computed on the encoded vectors (dequant fused into the SIMD dot product)
+        qtype = _SQ_TYPES[config.QUANTIZATION]
+        faiss_index = faiss.IndexHNSWSQ(dim, qtype, config.HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown QUANTIZATION '{config.QUANTIZATION}', expected fp32, {', '.join(_SQ_TYPES)}")
+    faiss_index.hnsw.efConstruction = config.EF_CONSTRUCTION
+    _set_ef_search(faiss_index, config.EF_SEARCH)
+    return HNSWFaissVectorStore(faiss_index=faiss_index)
+
+
+def load_vector_store(config: Config, persist_dir: str) -> HNSWFaissVectorStore:
+    """Loads a persisted store and applies the configured efSearch"""
+    vector_store = HNSWFaissVectorStore.from_persist_dir(persist_dir)
+    _set_ef_search(vector_store._faiss_index, config.EF_SEARCH)
+    return vector_store
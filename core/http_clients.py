@@ -0,0 +1,41 @@
+"""
+Shared HTTP clients for OpenAI calls and a background event loop for async work.
+
+Reusing one pooled client keeps TCP+TLS connections alive (and multiplexed over HTTP/2)
+across calls instead of paying a handshake per request. httpx.AsyncClient connections
+belong to the loop that opened them, so all async calls go through `run_async`, which
+schedules them on a single long-lived loop thread (a uvloop loop when installed: pip install uvloop).
+"""
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional
+
+import httpx
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+_TIMEOUT = 30.0
+
+http_client = httpx.Client(http2=True, limits=_LIMITS, timeout=_TIMEOUT)
+async_http_client = httpx.AsyncClient(http2=True, limits=_LIMITS, timeout=_TIMEOUT)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-io", daemon=True).start()
+        return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Runs coroutine on the shared background loop and blocks for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
@@ -1,38 +1,88 @@
 """
 RAG agent with LlamaIndex storage and LangChain agent logic, now with RERANK support
 """
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext, load_index_from_storage
+from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, StorageContext, load_index_from_storage, QueryBundle
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
 from llama_index.embeddings.openai import OpenAIEmbedding
-from llama_index.postprocessor import BgeRerank # add more rerankers here if needed
 from langchain_openai import ChatOpenAI
 from langchain.agents import Tool, AgentExecutor, create_openai_functions_agent
+from langchain.schema import HumanMessage, SystemMessage
 from core.config import Config
+from core.query_cache import QueryCache
+from core.embedding_batcher import EmbeddingBatcher
+from core.reranker import BatchedCrossEncoderRerank # add more rerankers here if needed
+from core.faiss_store import create_vector_store, load_vector_store
+from core.disk_vector_store import DiskANNVectorStore
+from core.embedding_cache import EmbeddingCache
+from core.rerank_kernels import mmr_select
+from core._warmup import warmup
+from core.web_cue import needs_web_search # questions matching it go to the full agent
+from core.http_clients import http_client, async_http_client, run_async
+import asyncio
+import functools
+import hashlib
 import os
+import numpy as np
+
+RAG_TOOL_DESCRIPTION = "Useful for answering questions about documents. Input should be a user question."
+WEB_TOOL_DESCRIPTION = "Useful for open web lookups. Input should be a user question."
+# (name, description) pairs: the only tool data the agent's function schemas depend on
+TOOL_SPECS = (("rag_search", RAG_TOOL_DESCRIPTION), ("search_web", WEB_TOOL_DESCRIPTION))
+
+DIRECT_SYSTEM_PROMPT = "Answer using CONTEXT only. If the answer is not in the context, say so."
+
+def _search_web(query: str) -> str:
+    return "(This would query the web; not implemented)"
+
+@functools.lru_cache(maxsize=8)
+def _build_agent(llm_model: str, api_key: str, tool_specs: tuple):
+    """
+    Builds LLM and the functions agent once per (model, key, tool schema).
+    Tools here only describe the schema; executors bind per-instance tools.
+    """
+    llm = ChatOpenAI(
+        model=llm_model,
+        api_key=api_key,
+        temperature=0.1,
+        http_client=http_client,
+        http_async_client=async_http_client
+    )
+    schema_tools = [Tool(name=name, func=_search_web, description=description) for name, description in tool_specs]
+    return llm, create_openai_functions_agent(llm, schema_tools)
 
 class RAGAgent:
     def __init__(self, config: Config = None):
         self.config = config or Config()
-        self.llm = ChatOpenAI(
-            model=self.config.LLM_MODEL,
-            api_key=self.config.OPENAI_API_KEY,
-            temperature=0.1
+        self.llm, agent = _build_agent(self.config.LLM_MODEL, self.config.OPENAI_API_KEY, TOOL_SPECS)
+        self.embedding = OpenAIEmbedding(
+            model=self.config.EMBEDDING_MODEL,
+            http_client=http_client,
+            async_http_client=async_http_client
         )
-        self.embedding = OpenAIEmbedding(model=self.config.EMBEDDING_MODEL)
+        self.embedding_cache = EmbeddingCache(self.config.EMBEDDING_CACHE_PATH, self.config.EMBEDDING_DIM)
         self.index = self._load_or_build_index()
         self.reranker = self._build_reranker()
+        self._cache = QueryCache(max_size=self.config.CACHE_SIZE, ttl=self.config.CACHE_TTL)
+        self._retrievers = {} # top_k -> retriever, built once per distinct top_k
+        self._batcher = EmbeddingBatcher(self.embedding, window_ms=self.config.BATCH_WINDOW_MS)
+        if self.config.USE_MMR:
+            warmup() # compile/load MMR kernel now, not on the first query
 
         self.rag_tool = Tool(
             name="rag_search",
             func=self._context_search,
-            description="Useful for answering questions about documents. Input should be a user question."
+            coroutine=self._acontext_search,
+            description=RAG_TOOL_DESCRIPTION
         )
         self.search_web_tool = Tool(
             name="search_web",
-            func=lambda q: "(This would query the web; not implemented)",
-            description="Useful for open web lookups. Input should be a user question."
+            func=_search_web,
+            description=WEB_TOOL_DESCRIPTION
         )
+        # Executor is cheap; it binds the cached agent to this instance's tools
         self.agent = AgentExecutor.from_agent_and_tools(
-            agent=create_openai_functions_agent(self.llm, [self.rag_tool, self.search_web_tool]),
+            agent=agent,
             tools=[self.rag_tool, self.search_web_tool],
             verbose=True
         )
@@ -40,8 +90,8 @@ class RAGAgent:
     def _build_reranker(self):
         """Return rerank postprocessor according to config. Extend for more rerankers."""
         if self.config.RERANKER_TYPE == "bge":
-            # BGE reranker: small, fast, local, good results (pip install 'llama-index-embeddings-huggingface[rerank]')
-            return BgeRerank(top_n=self.config.K_RERANK_TOP)
+            # BGE cross-encoder: all passages scored in one batched forward (fp16 on GPU)
+            return BatchedCrossEncoderRerank(model=self.config.RERANK_MODEL, top_n=self.config.K_RERANK_TOP)
         # TODO: elif self.config.RERANKER_TYPE == "openai": ...
         # fallback: no rerank
         return None
@@ -49,32 +99,214 @@ class RAGAgent:
     def _load_or_build_index(self):
         index_path = self.config.INDEX_PATH
         if os.path.exists(index_path):
-            return load_index_from_storage(StorageContext.from_defaults(persist_dir=index_path))
-        docs = SimpleDirectoryReader(self.config.CORPUS_PATH).load_data()
-        index = VectorStoreIndex.from_documents(docs, embed_model=self.embedding)
-        index.storage_context.persist(index_path)
+            storage_context = StorageContext.from_defaults(
+                vector_store=self._open_vector_store(),
+                persist_dir=index_path
+            )
+            return load_index_from_storage(storage_context, embed_model=self.embedding)
+        return self._build_index()
+
+    def _diskann_kwargs(self) -> dict:
+        return dict(
+            index_directory=os.path.join(self.config.INDEX_PATH, "diskann"),
+            complexity=self.config.DISKANN_COMPLEXITY,
+            beam_width=self.config.DISKANN_BEAM_WIDTH,
+        )
+
+    def _new_vector_store(self):
+        if self.config.BACKEND == "diskann":
+            return DiskANNVectorStore(**self._diskann_kwargs())
+        return create_vector_store(self.config)
+
+    def _open_vector_store(self):
+        if self.config.BACKEND == "diskann":
+            return DiskANNVectorStore.from_index_directory(**self._diskann_kwargs())
+        return load_vector_store(self.config, self.config.INDEX_PATH)
+
+    def _load_documents(self):
+        """Reads and parses the corpus with a pool of worker processes"""
+        reader = SimpleDirectoryReader(self.config.CORPUS_PATH)
+        num_workers = self.config.LOAD_WORKERS
+        if num_workers > 1 and len(reader.input_files) > 1:
+            return reader.load_data(num_workers=min(num_workers, len(reader.input_files)))
+        return reader.load_data()
+
+    def _build_index(self):
+        """Embeds corpus into a fresh vector store and persists it"""
+        return run_async(self._abuild_index())
+
+    async def _abuild_index(self):
+        """
+        Parse -> embed -> write pipeline: stages run concurrently over bounded queues,
+        so embedding requests overlap with parsing and vector store inserts.
+        """
+        batch_size = self.config.EMBED_BATCH_SIZE
+        write_batch_size = self.config.WRITE_BATCH_SIZE
+        storage_context = StorageContext.from_defaults(vector_store=self._new_vector_store())
+        index = VectorStoreIndex([], storage_context=storage_context, embed_model=self.embedding)
+        node_queue = asyncio.Queue(maxsize=4 * batch_size)
+        embedded_queue = asyncio.Queue(maxsize=4)
+
+        async def _parse_task():
+            loop = asyncio.get_running_loop()
+            docs = await loop.run_in_executor(None, self._load_documents)
+            splitter = SentenceSplitter()
+            for doc in docs:
+                for node in splitter.get_nodes_from_documents([doc]):
+                    await node_queue.put(node)
+            await node_queue.put(None)
+
+        async def _embed_task():
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < batch_size:
+                    node = await node_queue.get()
+                    if node is None:
+                        done = True
+                        break
+                    batch.append(node)
+                if batch:
+                    await self._aembed_nodes(batch)
+                    await embedded_queue.put(batch)
+            await embedded_queue.put(None)
+
+        async def _write_task():
+            pending = []
+            while True:
+                batch = await embedded_queue.get()
+                if batch is not None:
+                    pending.extend(batch)
+                if pending and (batch is None or len(pending) >= write_batch_size):
+                    # Nodes already carry embeddings, so the index does not call the API again
+                    index.insert_nodes(pending)
+                    pending = []
+                if batch is None:
+                    break
+
+        await asyncio.gather(_parse_task(), _embed_task(), _write_task())
+        index.storage_context.persist(self.config.INDEX_PATH)
         return index
 
+    async def _aembed_nodes(self, nodes) -> None:
+        """Sets node embeddings from the disk cache, embedding only unseen texts"""
+        texts = [n.get_content(metadata_mode=MetadataMode.EMBED) for n in nodes]
+        hashes = [EmbeddingCache.content_hash(t) for t in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        missing = {h: t for h, t in zip(hashes, texts) if h not in cached}
+        if missing:
+            vectors = await self.embedding.aget_text_embedding_batch(list(missing.values()), show_progress=False)
+            self.embedding_cache.put_many(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+        for node, h in zip(nodes, hashes):
+            node.embedding = np.asarray(cached[h], dtype=np.float32).tolist()
+
     def rebuild_index(self):
         """Force rebuild index from current corpus"""
-        docs = SimpleDirectoryReader(self.config.CORPUS_PATH).load_data()
-        index = VectorStoreIndex.from_documents(docs, embed_model=self.embedding)
-        index.storage_context.persist(self.config.INDEX_PATH)
-        self.index = index
+        self.index = self._build_index()
+        self._retrievers.clear()
+        self._cache.clear()
+
+    def _get_retriever(self, top_k: int):
+        retriever = self._retrievers.get(top_k)
+        if retriever is None:
+            retriever = self.index.as_retriever(similarity_top_k=top_k)
+            self._retrievers[top_k] = retriever
+        return retriever
+
+    @staticmethod
+    def _cache_key(query: str, top_k: int) -> str:
+        return hashlib.blake2b(query.encode(), digest_size=16).hexdigest() + f"|{top_k}"
 
     def _context_search(self, query: str, top_k: int=None) -> str:
-        retriever = self.index.as_retriever(similarity_top_k=top_k or self.config.TOP_K)
-        nodes = retriever.retrieve(query)
+        top_k = top_k or self.config.TOP_K
+        key = self._cache_key(query, top_k)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        query_embedding = self.embedding.get_query_embedding(query)
+        retriever = self._get_retriever(top_k)
+        nodes = retriever.retrieve(QueryBundle(query_str=query, embedding=query_embedding))
+        return self._postprocess(query, nodes, key, query_embedding)
+
+    async def _acontext_search(self, query: str, top_k: int=None) -> str:
+        top_k = top_k or self.config.TOP_K
+        key = self._cache_key(query, top_k)
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        # Concurrent callers share one embedding request per batch window
+        embedding = await self._batcher.embed(query)
+        retriever = self._get_retriever(top_k)
+        nodes = await retriever.aretrieve(QueryBundle(query_str=query, embedding=embedding))
+        return self._postprocess(query, nodes, key, embedding)
+
+    def _postprocess(self, query: str, nodes, key: str, query_embedding=None) -> str:
         # Apply reranker if set
         if self.reranker is not None and nodes:
-            reranked = self.reranker.postprocess_nodes(nodes, query=query)
+            reranked = self.reranker.postprocess_nodes(nodes, query_bundle=QueryBundle(query_str=query, embedding=query_embedding))
             nodes = reranked or nodes # fallback to old nodes if reranked is None
+        elif self.config.USE_MMR and query_embedding is not None and len(nodes) > 1:
+            nodes = self._mmr(nodes, query_embedding)
         if not nodes:
             return "No documents found."
-        output = "\n".join(n.get_content() for n in nodes)
+        output = self._join_context(nodes)
+        self._cache.put(key, output)
         return output
 
+    def _join_context(self, nodes) -> str:
+        """Concatenates node texts, stopping at MAX_CONTEXT_BYTES (UTF-8)"""
+        buf = bytearray()
+        limit = self.config.MAX_CONTEXT_BYTES
+        for n in nodes:
+            chunk = n.get_content().encode("utf-8")
+            if len(buf) + len(chunk) > limit:
+                buf += chunk[:limit - len(buf)]
+                break
+            buf += chunk
+            buf += b"\n"
+        # errors="ignore" drops a multi-byte char cut by the limit
+        return buf.decode("utf-8", errors="ignore").rstrip("\n")
+
+    def _mmr(self, nodes, query_embedding):
+        """Diversifies nodes with MMR; vectors come from the embedding cache"""
+        hashes = [
+            EmbeddingCache.content_hash(n.node.get_content(metadata_mode=MetadataMode.EMBED))
+            for n in nodes
+        ]
+        cached = self.embedding_cache.get_many(hashes)
+        if any(h not in cached for h in hashes):
+            return nodes # index built outside the cache, keep retriever order
+        doc_vectors = np.ascontiguousarray(np.stack([cached[h] for h in hashes]), dtype=np.float32)
+        order = mmr_select(
+            np.asarray(query_embedding, dtype=np.float32),
+            doc_vectors,
+            self.config.K_RERANK_TOP,
+            self.config.MMR_LAMBDA
+        )
+        return [nodes[i] for i in order]
+
     def answer(self, question: str) -> str:
         # LangChain agent call with given tools (RAG + web-search)
         resp = self.agent.invoke({"input": question})
         return resp["output"]  # final answer
+
+    def ask_direct(self, question: str) -> str:
+        """RAG without the agent: retrieval + one LLM call (no tool-selection turn)"""
+        context = self._context_search(question)
+        resp = self.llm.invoke([
+            SystemMessage(content=DIRECT_SYSTEM_PROMPT),
+            HumanMessage(content=f"CONTEXT:\n{context}\n\nQUESTION: {question}")
+        ])
+        return resp.content
+
+    def ask(self, question: str, allow_web: bool = True) -> str:
+        """Routes to the full agent only when the question asks for web lookups"""
+        if allow_web and needs_web_search(question):
+            return self.answer(question)
+        return self.ask_direct(question)
+
+    async def aanswer(self, question: str) -> str:
+        # Async variant: tool calls go through _acontext_search
+        resp = await self.agent.ainvoke({"input": question})
+        return resp["output"]
@@ -0,0 +1,64 @@
+"""
+Numba kernels for post-retrieval diversification (MMR)
+"""
+import os
+
+# Must be set before numba is imported; a prebuilt cache can ship with the Docker image
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join("data", ".numba_cache"))
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def mmr_select(query, docs, k, lam):
+    """
+    Maximal Marginal Relevance over a (n, dim) fp32 matrix.
+    Returns indices of the k selected rows in selection order.
+    """
+    n, dim = docs.shape
+    k = min(k, n)
+
+    q_norm = 0.0
+    for d in range(dim):
+        q_norm += query[d] * query[d]
+    q_norm = np.sqrt(q_norm) + 1e-12
+
+    norms = np.empty(n, np.float32)
+    sim_q = np.empty(n, np.float32)
+    for j in prange(n):
+        dot = 0.0
+        sq = 0.0
+        for d in range(dim):
+            dot += docs[j, d] * query[d]
+            sq += docs[j, d] * docs[j, d]
+        norms[j] = np.sqrt(sq) + 1e-12
+        sim_q[j] = dot / (norms[j] * q_norm)
+
+    # Highest similarity of every row to anything selected so far
+    max_div = np.zeros(n, np.float32)
+    chosen = np.zeros(n, np.bool_)
+    selected = np.full(k, -1, np.int64)
+    for i in range(k):
+        best = -1
+        best_score = -np.inf
+        for j in range(n):
+            if chosen[j]:
+                continue
+            score = lam * sim_q[j] - (1.0 - lam) * max_div[j]
+            if score > best_score:
+                best_score = score
+                best = j
+        selected[i] = best
+        chosen[best] = True
+
+        for j in prange(n):
+            if chosen[j]:
+                continue
+            dot = 0.0
+            for d in range(dim):
+                dot += docs[j, d] * docs[best, d]
+            sim = dot / (norms[j] * norms[best])
+            if sim > max_div[j]:
+                max_div[j] = sim
+    return selected
@@ -0,0 +1,59 @@
+"""
+Batched cross-encoder reranker (BGE) as a LlamaIndex node postprocessor
+"""
+from functools import lru_cache
+from typing import List, Optional
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+
+@lru_cache(maxsize=None)
+def _load_cross_encoder(model_name: str):
+    """Loads tokenizer+model once per process; fp16 on GPU, fp32 on CPU"""
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    dtype = torch.float16 if device == "cuda" else torch.float32
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name, torch_dtype=dtype).to(device).eval()
+    return tokenizer, model, device
+
+
+class BatchedCrossEncoderRerank(BaseNodePostprocessor):
+    """Scores all (query, passage) pairs in a single forward pass and keeps top_n"""
+
+    model: str = Field(default="BAAI/bge-reranker-base", description="Cross-encoder model name")
+    top_n: int = Field(default=4, description="Number of nodes to keep")
+    max_length: int = Field(default=512, description="Max tokens per (query, passage) pair")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "BatchedCrossEncoderRerank"
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None or not nodes:
+            return nodes
+
+        tokenizer, model, device = _load_cross_encoder(self.model)
+        pairs = [[query_bundle.query_str, n.node.get_content()] for n in nodes]
+        inputs = tokenizer(
+            pairs,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="pt",
+        ).to(device)
+        with torch.inference_mode():
+            logits = model(**inputs, return_dict=False)[0]
+        scores = logits[:, 0].float().cpu().tolist()
+
+        for node, score in zip(nodes, scores):
+            node.score = score
+        order = sorted(range(len(nodes)), key=scores.__getitem__, reverse=True)
+        return [nodes[i] for i in order[:self.top_n]]
@@ -0,0 +1,48 @@
+"""
+Detects questions that need the web-search tool.
+Uses a Hyperscan DFA database when available (pip install hyperscan), stdlib re otherwise.
+"""
+import re
+import threading
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+WEB_CUE_PATTERNS = (
+    r"\bsearch the web\b",
+    r"\bweb search\b",
+    r"\bgoogle\b",
+    r"\blatest\b",
+    r"\bcurrent\b",
+    r"\btoday\b",
+    r"\bnews\b",
+)
+
+WEB_SEARCH_CUE = re.compile("|".join(WEB_CUE_PATTERNS), re.IGNORECASE)
+
+
+def _compile_database():
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[p.encode() for p in WEB_CUE_PATTERNS],
+        ids=list(range(len(WEB_CUE_PATTERNS))),
+        flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH] * len(WEB_CUE_PATTERNS),
+    )
+    return db
+
+
+_DATABASE = _compile_database() if hyperscan is not None else None
+# A Database owns a single scratch space, so scans must not run concurrently
+_SCAN_LOCK = threading.Lock()
+
+
+def needs_web_search(question: str) -> bool:
+    """True if the question contains any web-search cue"""
+    if _DATABASE is None:
+        return WEB_SEARCH_CUE.search(question) is not None
+    matched = []
+    with _SCAN_LOCK:
+        _DATABASE.scan(question.encode("utf-8"), match_event_handler=lambda i, start, end, flags, ctx: matched.append(i))
+    return bool(matched)
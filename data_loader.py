@@ -1,16 +1,33 @@
 """
 Module for loading and processing data from Open RAG Benchmark
 """
-import json
+import functools
+import hashlib
+import mmap
 import os
-import requests
-from typing import List, Dict, Any
+import pickle
+import time
+import orjson
+from typing import List, Dict, Any, Iterable, Optional, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Consolidated corpus: one JSON document per line
+CORPUS_FILE = "corpus.ndjson"
+# Serialized papers start with their id: it is read from there without parsing the line
+_ID_PREFIX = b'{"id":"'
+# Below this size the corpus is read in one go instead of memory-mapped
+MMAP_MIN_SIZE = 1 << 20
+
+# Parsed-corpus pickle cache, enabled by creating data_dir/.cache_enabled. It lives in a private
+# data_dir/.cache (mode 0o700), since a world-writable tempdir would let anyone plant a pickle
+CACHE_FLAG_FILE = ".cache_enabled"
+CACHE_DIR = ".cache"
+CORPUS_CACHE_TTL = 24 * 60 * 60
+
 class OpenRAGDataLoader:
     """Class for loading data from Open RAG Benchmark dataset"""
     
@@ -18,14 +35,16 @@ class OpenRAGDataLoader:
         self.data_dir = Path(data_dir)
         self.corpus_dir = self.data_dir / "corpus"
         self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.corpus_file = self.data_dir / CORPUS_FILE
         
     def download_dataset(self, huggingface_url: str = None):
         """
         Downloads dataset from Hugging Face or local source
         """
         if huggingface_url:
-            logger.info(f"Downloading dataset from {huggingface_url}")
+            logger.info("Downloading dataset from %s", huggingface_url)
             # Code for downloading from Hugging Face can be added here
+            # (import requests/datasets locally here, they are slow to import at module level)
             pass
         else:
             logger.info("Using local data or creating examples")
@@ -78,42 +97,203 @@ class OpenRAGDataLoader:
             }
         ]
         
-        # Save sample documents
-        for paper in sample_papers:
-            paper_path = self.corpus_dir / f"{paper['id']}.json"
-            with open(paper_path, 'w', encoding='utf-8') as f:
-                json.dump(paper, f, ensure_ascii=False, indent=2)
+        # Merged into the consolidated corpus next to the papers already there
+        self.add_papers(sample_papers)
+        logger.info("Created %d sample documents", len(sample_papers))
+    
+    def load_corpus(self, fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        Loads all documents from corpus, keeping only `fields` of each paper if given.
+        Parsed once per process while corpus.ndjson is unchanged; repeated calls return the same list.
+        """
+        self._ensure_corpus_file()
+        stat = self.corpus_file.stat()
+        return _load_corpus_cached(str(self.data_dir.resolve()), stat.st_size, stat.st_mtime_ns, fields)
+    
+    def _read_corpus(self, fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """Reads the corpus from the pickle cache (if enabled) or corpus.ndjson"""
+        cache_path = self._corpus_cache_path(fields) if (self.data_dir / CACHE_FLAG_FILE).exists() else None
+        if cache_path is not None and cache_path.exists() and time.time() - cache_path.stat().st_mtime < CORPUS_CACHE_TTL:
+            try:
+                with open(cache_path, 'rb') as f:
+                    papers = pickle.load(f)
+                logger.info("Loaded %d documents from cache", len(papers))
+                return papers
+            except Exception as e:
+                logger.warning("Ignoring unreadable corpus cache %s: %s", cache_path, e)
+        
+        if fields is None:
+            papers = list(self.load_corpus_stream())
+        else:
+            # Projected right after each parse, so full paper dicts are never held all at once
+            papers = [{k: paper[k] for k in fields if k in paper} for paper in self.load_corpus_stream()]
         
-        logger.info(f"Created {len(sample_papers)} sample documents")
+        if cache_path is not None:
+            cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            # Written aside and renamed, so a concurrent reader never unpickles a partial file
+            tmp_file = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(papers, f, protocol=5)
+            tmp_file.replace(cache_path)
+        
+        logger.info("Loaded %d documents", len(papers))
+        return papers
+    
+    def _corpus_cache_path(self, fields: Optional[Tuple[str, ...]] = None) -> Path:
+        """Cache file keyed by corpus file path, size, mtime (cheap stand-in for a content hash) and projection"""
+        stat = self.corpus_file.stat()
+        key = hashlib.blake2b(
+            f"{self.corpus_file.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{fields}".encode(), digest_size=16
+        ).hexdigest()
+        return self.data_dir / CACHE_DIR / f"{key}.pkl"
+    
+    def _ensure_corpus_file(self) -> None:
+        """Creates/refreshes corpus.ndjson before reading"""
+        # Per-paper JSON files newer than the ndjson get merged in first. The newest file, not the
+        # directory, decides: a directory's mtime does not change when a file is edited in place
+        if not self.corpus_file.exists() or self._newest_paper_mtime_ns() > self.corpus_file.stat().st_mtime_ns:
+            self._consolidate_corpus()
+    
+    def _newest_paper_mtime_ns(self) -> int:
+        with os.scandir(self.corpus_dir) as it:
+            return max((entry.stat().st_mtime_ns for entry in it if entry.name.endswith('.json') and entry.is_file()),
+                       default=0)
     
-    def load_corpus(self) -> List[Dict[str, Any]]:
+    def load_corpus_stream(self) -> Iterator[Dict[str, Any]]:
         """
-        Loads all documents from corpus
+        Yields documents one by one from the consolidated corpus.ndjson file
         """
-        papers = []
+        self._ensure_corpus_file()
         
-        if not self.corpus_dir.exists():
-            logger.warning("Corpus directory not found, creating sample data")
-            self._create_sample_data()
+        size = self.corpus_file.stat().st_size
+        if size < MMAP_MIN_SIZE:
+            # Small corpus: one read is cheaper than setting up a mapping
+            lines = self.corpus_file.read_bytes().splitlines()
+            for line in lines:
+                if line.strip():
+                    yield orjson.loads(line)
+            return
         
-        for paper_file in self.corpus_dir.glob("*.json"):
+        # Pages are mapped on demand, no full userspace copy of the file
+        fd = os.open(self.corpus_file, os.O_RDONLY)
+        try:
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
             try:
-                with open(paper_file, 'r', encoding='utf-8') as f:
-                    paper = json.load(f)
-                    papers.append(paper)
-            except Exception as e:
-                logger.error(f"Error loading {paper_file}: {e}")
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                for line in iter(mm.readline, b''):
+                    if line.strip():
+                        yield orjson.loads(line)
+            finally:
+                mm.close()
+        finally:
+            os.close(fd)
+    
+    def add_papers(self, papers: Iterable[Dict[str, Any]]) -> None:
+        """
+        Adds papers to corpus.ndjson, see add_paper_lines
+        """
+        self.add_paper_lines(orjson.dumps(paper) for paper in papers)
+    
+    def add_paper_lines(self, lines: Iterable[bytes]) -> None:
+        """
+        Adds serialized papers (one JSON document each) to corpus.ndjson; they replace stored papers with
+        the same id. Stored lines are copied through unchanged, only their ids are read
+        """
+        new: Dict[Any, bytes] = {}
+        for line in lines:
+            line = line.strip()
+            if line:
+                new[self._line_id(line)] = line
+        if not new:
+            return
         
-        logger.info(f"Loaded {len(papers)} documents")
-        return papers
+        # Per-paper files newer than the ndjson are merged in first (this also creates the ndjson)
+        self._ensure_corpus_file()
+        with open(self.corpus_file, 'rb') as f:
+            replaces = any(self._line_id(line) in new for line in f if line.strip())
+        
+        if replaces:
+            tmp_file = self.corpus_file.with_suffix(".ndjson.tmp")
+            with open(self.corpus_file, 'rb') as src, open(tmp_file, 'wb', buffering=1 << 20) as out:
+                for line in src:
+                    if line.strip() and self._line_id(line) not in new:
+                        out.write(line if line.endswith(b"\n") else line + b"\n")
+                self._write_lines(out, new.values())
+            tmp_file.replace(self.corpus_file)
+        else:
+            # Only new ids: one buffered append, the stored lines are not rewritten
+            with open(self.corpus_file, 'r+b', buffering=1 << 20) as out:
+                end = out.seek(0, os.SEEK_END)
+                if end and os.pread(out.fileno(), 1, end - 1) != b"\n":
+                    out.write(b"\n")
+                self._write_lines(out, new.values())
+        logger.info("Added %d documents to %s", len(new), self.corpus_file)
+    
+    @staticmethod
+    def _write_lines(out, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            out.write(line)
+            out.write(b"\n")
+    
+    @staticmethod
+    def _line_id(line: bytes) -> Any:
+        """id of a serialized paper, read from the line's start when it leads (as orjson writes it)"""
+        if line.startswith(_ID_PREFIX):
+            end = line.find(b'"', len(_ID_PREFIX))
+            if end != -1 and b"\\" not in line[len(_ID_PREFIX):end]:
+                return line[len(_ID_PREFIX):end].decode()
+        return orjson.loads(line).get("id")
+    
+    def _consolidate_corpus(self) -> None:
+        """
+        Merges per-paper *.json files into corpus.ndjson (one document per line).
+        Documents already in the ndjson are kept; per-paper files win on equal id.
+        """
+        # scandir yields DirEntry objects with cached type info, no fnmatch/Path per entry
+        with os.scandir(self.corpus_dir) as it:
+            files = [entry.path for entry in it if entry.name.endswith('.json') and entry.is_file()]
+        
+        # Reads release the GIL, so a thread pool overlaps file I/O across papers
+        max_workers = min(32, (os.cpu_count() or 1) * 4, max(len(files), 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            papers = [paper for paper in executor.map(self._load_paper, files) if paper is not None]
+        
+        merged: Dict[Any, Dict[str, Any]] = {}
+        if self.corpus_file.exists():
+            with open(self.corpus_file, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        paper = orjson.loads(line)
+                        merged[paper.get("id")] = paper
+        for paper in papers:
+            merged[paper.get("id")] = paper
+        
+        tmp_file = self.corpus_file.with_suffix(".ndjson.tmp")
+        with open(tmp_file, 'wb') as f:
+            for paper in merged.values():
+                f.write(orjson.dumps(paper))
+                f.write(b"\n")
+        tmp_file.replace(self.corpus_file)
+        logger.info("Consolidated %d documents into %s", len(merged), self.corpus_file)
+    
+    @staticmethod
+    def _load_paper(paper_file: str) -> Optional[Dict[str, Any]]:
+        """Parses a single paper file, returns None on error"""
+        try:
+            # orjson parses UTF-8 bytes directly, no str decode step
+            with open(paper_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except Exception as e:
+            logger.error("Error loading %s: %s", paper_file, e)
+            return None
     
     def load_queries(self, queries_path: str = None) -> Dict[str, Any]:
         """
         Loads queries from queries.json file
         """
         if queries_path and os.path.exists(queries_path):
-            with open(queries_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return orjson.loads(Path(queries_path).read_bytes())
         else:
             # Create sample queries
             return {
@@ -134,8 +314,7 @@ class OpenRAGDataLoader:
         Loads query-document relevance
         """
         if qrels_path and os.path.exists(qrels_path):
-            with open(qrels_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return orjson.loads(Path(qrels_path).read_bytes())
         else:
             # Create sample relevance
             return {
@@ -148,3 +327,9 @@ class OpenRAGDataLoader:
                     "section_id": 1
                 }
             }
+
+
+@functools.lru_cache(maxsize=1)
+def _load_corpus_cached(data_dir: str, size: int, mtime_ns: int, fields: Optional[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    # size and mtime_ns only key the cache, a rewritten corpus.ndjson misses it
+    return OpenRAGDataLoader(data_dir)._read_corpus(fields)
@@ -1,14 +1,118 @@
 """
 Скрипт для настройки данных из Open RAG Benchmark
 """
+import itertools
 import os
-import json
-import requests
+import orjson
 from pathlib import Path
 import logging
+from tqdm import tqdm
+
+from data_loader import CORPUS_FILE, OpenRAGDataLoader
 
 logger = logging.getLogger(__name__)
 
+# User-visible messages; language is picked by RAG_LANG ('en' | 'ru')
+MESSAGES = {
+    "en": {
+        "hf_download": "📥 Downloading dataset {dataset_name} from Hugging Face...",
+        "saving_docs": "📚 Saving {count} documents...",
+        "saved_queries": "💬 Saved {count} queries",
+        "saved_qrels": "🔗 Saved {count} query-document links",
+        "hf_done": "✅ Dataset downloaded successfully!",
+        "hf_missing": "❌ To download from Hugging Face install: pip install datasets",
+        "hf_error": "❌ Error downloading dataset: {error}",
+        "samples_start": "📥 Creating {count} sample papers...",
+        "paper_error": "   ❌ Error creating paper {paper_id}: {error}",
+        "samples_done": "✅ Created {count} sample papers",
+        "setup_start": "🚀 Setting up data for RAG system",
+        "data_saved": "\n📁 Data saved to: {data_dir}",
+        "setup_done": "✅ Data setup completed!",
+        "cli_description": "Data setup for RAG system",
+        "cli_huggingface": "Download data from Hugging Face",
+        "cli_samples": "Number of sample papers (default: 10)",
+    },
+    "ru": {
+        "hf_download": "📥 Загрузка датасета {dataset_name} с Hugging Face...",
+        "saving_docs": "📚 Сохранение {count} документов...",
+        "saved_queries": "💬 Сохранено {count} запросов",
+        "saved_qrels": "🔗 Сохранено {count} связей запрос-документ",
+        "hf_done": "✅ Датасет успешно загружен!",
+        "hf_missing": "❌ Для загрузки с Hugging Face установите: pip install datasets",
+        "hf_error": "❌ Ошибка при загрузке датасета: {error}",
+        "samples_start": "📥 Загрузка {count} примеров статей...",
+        "paper_error": "   ❌ Ошибка при создании статьи {paper_id}: {error}",
+        "samples_done": "✅ Создано {count} примеров статей",
+        "setup_start": "🚀 Настройка данных для RAG-системы",
+        "data_saved": "\n📁 Данные сохранены в: {data_dir}",
+        "setup_done": "✅ Настройка данных завершена!",
+        "cli_description": "Настройка данных для RAG-системы",
+        "cli_huggingface": "Загрузить данные с Hugging Face",
+        "cli_samples": "Количество примеров статей (по умолчанию: 10)",
+    },
+}
+LANG = os.environ.get("RAG_LANG", "en")
+_MESSAGES = MESSAGES.get(LANG, MESSAGES["en"])
+
+def _T(key: str, **kwargs) -> str:
+    """Returns localized message formatted with kwargs"""
+    return _MESSAGES[key].format(**kwargs)
+
+# orjson writes UTF-8 bytes directly (non-ASCII kept as is); compact output, the files are only machine-read
+JSON_DUMP_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+SAMPLE_TOPICS = (
+    "машинное обучение", "нейронные сети", "глубокое обучение",
+    "обработка естественного языка", "компьютерное зрение",
+    "робототехника", "искусственный интеллект", "анализ данных"
+)
+
+SAMPLE_CATEGORIES = (
+    ["cs.AI", "cs.LG"], ["cs.LG", "cs.NE"], ["cs.CV", "cs.LG"],
+    ["cs.CL", "cs.AI"], ["cs.IR", "cs.LG"], ["cs.RO", "cs.AI"]
+)
+
+# Готовые JSON-фрагменты для подстановки в шаблон (2, 3 или 4 автора)
+_TOPIC_BYTES = [orjson.dumps(topic)[1:-1] for topic in SAMPLE_TOPICS]
+_CATEGORIES_BYTES = [orjson.dumps(category) for category in SAMPLE_CATEGORIES]
+_AUTHORS_BYTES = [orjson.dumps([f"Исследователь {i+1}" for i in range(2 + n)]) for n in range(3)]
+
+def _sample_paper_template() -> bytes:
+    """Сериализует статью-пример один раз с плейсхолдерами {ID}, {TOPIC}, {AUTHORS}, {CATEGORIES}"""
+    paper_id, topic = "{ID}", "{TOPIC}"
+    paper = {
+        "id": paper_id,
+        "title": f"Исследование {topic}: современные подходы и методы",
+        "authors": "{AUTHORS}",
+        "categories": "{CATEGORIES}",
+        "abstract": f"В данной работе представлены современные подходы к решению задач в области {topic}. Рассматриваются различные методы и алгоритмы, их преимущества и недостатки. Проведен сравнительный анализ эффективности предложенных решений.",
+        "published": "2024-01-01",
+        "updated": "2024-01-01",
+        "sections": [
+            {
+                "text": f"Введение в область {topic}. Данная область исследований является одной из наиболее динамично развивающихся в современной информатике. Основные задачи включают в себя разработку эффективных алгоритмов и методов для решения сложных вычислительных проблем.",
+                "tables": {},
+                "images": {}
+            },
+            {
+                "text": f"Методология исследования. В рамках данного исследования были применены следующие подходы: статистический анализ, машинное обучение, глубокие нейронные сети. Каждый из методов имеет свои особенности и область применения.",
+                "tables": {
+                    "table_1": "| Метод | Точность | Время обучения |\n|-------|----------|----------------|\n| SVM | 85% | 10 мин |\n| Random Forest | 88% | 5 мин |\n| Neural Network | 92% | 30 мин |"
+                },
+                "images": {}
+            },
+            {
+                "text": f"Результаты и обсуждение. Экспериментальные результаты показывают высокую эффективность предложенных методов в области {topic}. Достигнуто улучшение показателей точности на 15% по сравнению с существующими решениями.",
+                "tables": {},
+                "images": {
+                    "figure_1": "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+                }
+            }
+        ]
+    }
+    # Компактный JSON: одна строка на документ в corpus.ndjson
+    return orjson.dumps(paper)
+
 class OpenRAGDataSetup:
     """Класс для настройки данных из Open RAG Benchmark"""
     
@@ -16,6 +120,7 @@ class OpenRAGDataSetup:
         self.data_dir = Path(data_dir)
         self.corpus_dir = self.data_dir / "corpus"
         self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self._sample_template = _sample_paper_template()
     
     def download_from_huggingface(self, dataset_name: str = "vectara/open-rag-bench"):
         """
@@ -25,7 +130,7 @@ class OpenRAGDataSetup:
         try:
             from datasets import load_dataset
             
-            print(f"📥 Загрузка датасета {dataset_name} с Hugging Face...")
+            print(_T("hf_download", dataset_name=dataset_name))
             
             # Загружаем датасет
             dataset = load_dataset(dataset_name)
@@ -33,44 +138,43 @@ class OpenRAGDataSetup:
             # Сохраняем корпус документов
             if 'corpus' in dataset:
                 corpus_data = dataset['corpus']
-                print(f"📚 Сохранение {len(corpus_data)} документов...")
+                print(_T("saving_docs", count=len(corpus_data)))
                 
-                for i, doc in enumerate(corpus_data):
-                    doc_path = self.corpus_dir / f"{doc['id']}.json"
-                    with open(doc_path, 'w', encoding='utf-8') as f:
-                        json.dump(doc, f, ensure_ascii=False, indent=2)
-                    
-                    if (i + 1) % 100 == 0:
-                        print(f"   Обработано {i + 1} документов...")
+                # Один ndjson-файл вместо файла на документ: последовательная запись и чтение
+                # tqdm перерисовывает прогресс с ограниченной частотой, а не на каждый документ
+                with open(self.data_dir / CORPUS_FILE, 'wb') as f:
+                    for doc in tqdm(corpus_data, unit="doc"):
+                        f.write(orjson.dumps(doc))
+                        f.write(b"\n")
             
             # Сохраняем запросы
             if 'queries' in dataset:
                 queries_data = dataset['queries']
                 queries_path = self.data_dir / "queries.json"
-                with open(queries_path, 'w', encoding='utf-8') as f:
-                    json.dump(queries_data, f, ensure_ascii=False, indent=2)
-                print(f"💬 Сохранено {len(queries_data)} запросов")
+                with open(queries_path, 'wb') as f:
+                    f.write(orjson.dumps(queries_data, option=JSON_DUMP_OPTIONS))
+                print(_T("saved_queries", count=len(queries_data)))
             
             # Сохраняем релевантность
             if 'qrels' in dataset:
                 qrels_data = dataset['qrels']
                 qrels_path = self.data_dir / "qrels.json"
-                with open(qrels_path, 'w', encoding='utf-8') as f:
-                    json.dump(qrels_data, f, ensure_ascii=False, indent=2)
-                print(f"🔗 Сохранено {len(qrels_data)} связей запрос-документ")
+                with open(qrels_path, 'wb') as f:
+                    f.write(orjson.dumps(qrels_data, option=JSON_DUMP_OPTIONS))
+                print(_T("saved_qrels", count=len(qrels_data)))
             
-            print("✅ Датасет успешно загружен!")
+            print(_T("hf_done"))
             
         except ImportError:
-            print("❌ Для загрузки с Hugging Face установите: pip install datasets")
+            print(_T("hf_missing"))
         except Exception as e:
-            print(f"❌ Ошибка при загрузке датасета: {e}")
+            print(_T("hf_error", error=e))
     
     def download_sample_papers(self, num_papers: int = 10):
         """
         Загружает примеры статей из arXiv для демонстрации
         """
-        print(f"📥 Загрузка {num_papers} примеров статей...")
+        print(_T("samples_start", count=num_papers))
         
         # Примеры ID статей из разных категорий arXiv
         sample_paper_ids = [
@@ -86,76 +190,37 @@ class OpenRAGDataSetup:
             "2301.00010",  # cs.DB
         ]
         
-        for i, paper_id in enumerate(sample_paper_ids[:num_papers]):
-            try:
-                # Создаем пример статьи
-                sample_paper = self._create_sample_paper(paper_id, i)
-                
-                # Сохраняем
-                paper_path = self.corpus_dir / f"{paper_id}.json"
-                with open(paper_path, 'w', encoding='utf-8') as f:
-                    json.dump(sample_paper, f, ensure_ascii=False, indent=2)
-                
-                print(f"   ✅ Создана статья {paper_id}")
-                
-            except Exception as e:
-                print(f"   ❌ Ошибка при создании статьи {paper_id}: {e}")
-        
-        print(f"✅ Создано {num_papers} примеров статей")
-    
-    def _create_sample_paper(self, paper_id: str, index: int) -> dict:
-        """Создает пример статьи"""
+        # Темы, авторы и категории идут по кругу
+        topics = itertools.cycle(_TOPIC_BYTES)
+        authors = itertools.cycle(_AUTHORS_BYTES)
+        categories = itertools.cycle(_CATEGORIES_BYTES)
         
-        topics = [
-            "машинное обучение", "нейронные сети", "глубокое обучение",
-            "обработка естественного языка", "компьютерное зрение",
-            "робототехника", "искусственный интеллект", "анализ данных"
-        ]
+        def _render_all():
+            for paper_id in tqdm(sample_paper_ids[:num_papers], unit="paper"):
+                try:
+                    # Создаем пример статьи из шаблона
+                    yield self._render_sample_paper(paper_id, next(topics), next(authors), next(categories))
+                except Exception as e:
+                    tqdm.write(_T("paper_error", paper_id=paper_id, error=e))
         
-        categories = [
-            ["cs.AI", "cs.LG"], ["cs.LG", "cs.NE"], ["cs.CV", "cs.LG"],
-            ["cs.CL", "cs.AI"], ["cs.IR", "cs.LG"], ["cs.RO", "cs.AI"]
-        ]
+        # Дописываем готовые байты в общий corpus.ndjson, не затирая уже загруженные статьи
+        OpenRAGDataLoader(str(self.data_dir)).add_paper_lines(_render_all())
         
-        topic = topics[index % len(topics)]
-        category = categories[index % len(categories)]
-        
-        return {
-            "id": paper_id,
-            "title": f"Исследование {topic}: современные подходы и методы",
-            "authors": [f"Исследователь {i+1}" for i in range(2 + index % 3)],
-            "categories": category,
-            "abstract": f"В данной работе представлены современные подходы к решению задач в области {topic}. Рассматриваются различные методы и алгоритмы, их преимущества и недостатки. Проведен сравнительный анализ эффективности предложенных решений.",
-            "published": "2024-01-01",
-            "updated": "2024-01-01",
-            "sections": [
-                {
-                    "text": f"Введение в область {topic}. Данная область исследований является одной из наиболее динамично развивающихся в современной информатике. Основные задачи включают в себя разработку эффективных алгоритмов и методов для решения сложных вычислительных проблем.",
-                    "tables": {},
-                    "images": {}
-                },
-                {
-                    "text": f"Методология исследования. В рамках данного исследования были применены следующие подходы: статистический анализ, машинное обучение, глубокие нейронные сети. Каждый из методов имеет свои особенности и область применения.",
-                    "tables": {
-                        "table_1": "| Метод | Точность | Время обучения |\n|-------|----------|----------------|\n| SVM | 85% | 10 мин |\n| Random Forest | 88% | 5 мин |\n| Neural Network | 92% | 30 мин |"
-                    },
-                    "images": {}
-                },
-                {
-                    "text": f"Результаты и обсуждение. Экспериментальные результаты показывают высокую эффективность предложенных методов в области {topic}. Достигнуто улучшение показателей точности на 15% по сравнению с существующими решениями.",
-                    "tables": {},
-                    "images": {
-                        "figure_1": "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
-                    }
-                }
-            ]
-        }
+        print(_T("samples_done", count=num_papers))
+    
+    def _render_sample_paper(self, paper_id: str, topic: bytes, authors: bytes, categories: bytes) -> bytes:
+        """Подставляет id и готовые JSON-фрагменты темы, авторов и категорий в шаблон"""
+        return (self._sample_template
+                .replace(b"{ID}", orjson.dumps(paper_id)[1:-1])
+                .replace(b"{TOPIC}", topic)
+                .replace(b'"{AUTHORS}"', authors)
+                .replace(b'"{CATEGORIES}"', categories))
     
     def setup_data(self, use_huggingface: bool = False, num_samples: int = 10):
         """
         Основной метод для настройки данных
         """
-        print("🚀 Настройка данных для RAG-системы")
+        print(_T("setup_start"))
         print("=" * 50)
         
         if use_huggingface:
@@ -163,18 +228,18 @@ class OpenRAGDataSetup:
         else:
             self.download_sample_papers(num_samples)
         
-        print(f"\n📁 Данные сохранены в: {self.data_dir}")
-        print("✅ Настройка данных завершена!")
+        print(_T("data_saved", data_dir=self.data_dir))
+        print(_T("setup_done"))
 
 def main():
     """Основная функция для настройки данных"""
     import argparse
     
-    parser = argparse.ArgumentParser(description="Настройка данных для RAG-системы")
+    parser = argparse.ArgumentParser(description=_T("cli_description"))
     parser.add_argument("--huggingface", action="store_true", 
-                       help="Загрузить данные с Hugging Face")
+                       help=_T("cli_huggingface"))
     parser.add_argument("--samples", type=int, default=10,
-                       help="Количество примеров статей (по умолчанию: 10)")
+                       help=_T("cli_samples"))
     
     args = parser.parse_args()
     
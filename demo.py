@@ -1,16 +1,20 @@
 """
 Demonstration script for RAG system
 """
+import logging
 import os
 import time
 from dotenv import load_dotenv
 
 from rag_system import RAGSystem
-from config import Config
+from core.config import Config
 
 # Load environment variables
 load_dotenv()
 
+# Looked up once, after .env is loaded
+HAVE_OPENAI_KEY = bool(os.environ.get("OPENAI_API_KEY"))
+
 def print_separator(title=""):
     """Prints separator with title"""
     print("\n" + "=" * 60)
@@ -25,7 +29,7 @@ def demo_rag_system():
     print("Search and answer generation system based on Open RAG Benchmark")
     
     # Check API key
-    if not os.getenv("OPENAI_API_KEY"):
+    if not HAVE_OPENAI_KEY:
         print_separator("⚠️ WARNING")
         print("OpenAI API key not found!")
         print("For full demonstration, create .env file with your API key:")
@@ -38,9 +42,9 @@ def demo_rag_system():
     rag_system = RAGSystem(config)
     
     print("Loading and processing data...")
-    start_time = time.time()
+    start_time = time.perf_counter()
     rag_system.initialize_system()
-    init_time = time.time() - start_time
+    init_time = time.perf_counter() - start_time
     
     print(f"✅ System initialized in {init_time:.2f} seconds")
     
@@ -60,9 +64,11 @@ def demo_rag_system():
         "image recognition"
     ]
     
-    for query in demo_queries:
+    # One embedding pass for all demo queries
+    all_results = rag_system.search_documents_batch(demo_queries, n_results=3)
+    
+    for query, results in zip(demo_queries, all_results):
         print(f"\n🔎 Search: '{query}'")
-        results = rag_system.search_documents(query, n_results=3)
         
         if results:
             print(f"   Found {len(results)} relevant documents:")
@@ -91,9 +97,9 @@ def demo_rag_system():
             print(f"\n❓ Question: {question}")
             print("🤔 Generating answer...")
             
-            start_time = time.time()
+            start_time = time.perf_counter()
             result = rag_system.generate_answer(question, n_results=3)
-            gen_time = time.time() - start_time
+            gen_time = time.perf_counter() - start_time
             
             if result.get('error'):
                 print(f"❌ Error: {result['error']}")
@@ -108,16 +114,18 @@ def demo_rag_system():
     # Filtering demonstration
     print_separator("🎯 FILTERING DEMONSTRATION")
     
+    text_results, table_results, image_results = rag_system.search_documents_batch(
+        ["machine learning", "statistics", "diagram"],
+        content_types=["text", "table", "image"]
+    )
+    
     print("🔍 Search only in text documents:")
-    text_results = rag_system.search_documents("machine learning", content_type="text")
     print(f"   Found text documents: {len(text_results)}")
     
     print("🔍 Search only in tables:")
-    table_results = rag_system.search_documents("statistics", content_type="table")
     print(f"   Found tables: {len(table_results)}")
     
     print("🔍 Search only in images:")
-    image_results = rag_system.search_documents("diagram", content_type="image")
     print(f"   Found images: {len(image_results)}")
     
     # Conclusion
@@ -129,4 +137,5 @@ def demo_rag_system():
     print("  • Testing: python test_system.py")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     demo_rag_system()
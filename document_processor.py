@@ -1,174 +1,315 @@
 """
 Module for document processing and chunking
 """
-from typing import List, Dict, Any, Tuple
+import base64
+import binascii
+import bisect
+import functools
+import hashlib
+import mmap
+import os
+from collections import Counter, deque
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import re
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import tiktoken
 from langchain.schema import Document
 import logging
 
+from core.embedding_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
+# Paper fields read by process_paper; everything else in a corpus record is dropped at load time
+PAPER_FIELDS = ("id", "title", "authors", "categories", "abstract", "published", "updated", "sections")
+
+# Chunk sizes are counted in tokens of this encoding (the one used by OpenAI chat/embedding models)
+TOKEN_ENCODING = "cl100k_base"
+# Split points are snapped back to the first of these found in a window's second half;
+# with none, the window is cut at a token boundary
+SEPARATORS = ("\n\n", "\n", ". ", " ")
+# Text chunks shorter than chunk_size // MIN_CHUNK_RATIO tokens are merged into a neighbour
+MIN_CHUNK_RATIO = 5
+
+# Stored image file extension by magic bytes
+IMAGE_EXTENSIONS = ((b"\x89PNG", ".png"), (b"\xff\xd8", ".jpg"), (b"GIF8", ".gif"))
+
+# Below this many papers the process pool start-up costs more than it saves
+MIN_PARALLEL_PAPERS = 8
+# Papers per worker task, and tasks in flight per worker: bounds the finished chunks waiting for a slow consumer
+MAX_PAPERS_PER_TASK = 32
+TASKS_PER_WORKER = 2
+
+@functools.lru_cache(maxsize=None)
+def _get_encoding(name: str = TOKEN_ENCODING) -> tiktoken.Encoding:
+    return tiktoken.get_encoding(name)
+
 class DocumentProcessor:
     """Class for document processing and chunking"""
     
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50, image_store_dir: str = "data/images"):
+        # Sizes are in tokens
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
-        )
+        # Decoded images are kept here (content-addressed); chunks only carry the path
+        self.image_store_dir = Path(image_store_dir)
+        self.min_chunk_tokens = chunk_size // MIN_CHUNK_RATIO
+        self.encoding = _get_encoding()
+        # paper_id -> paper_metadata(paper) of every processed paper
+        self.paper_meta_table: Dict[str, Dict[str, Any]] = {}
+        # Stats of the last (possibly partial) iter_corpus_rows pass, see get_document_stats
+        self.last_stats: Optional[Dict[str, Any]] = None
+    
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
     
     def process_paper(self, paper: Dict[str, Any]) -> List[Document]:
         """
         Processes a single paper and creates chunks
         """
-        documents = []
-        
-        # Create basic document information
-        metadata = {
-            "paper_id": paper["id"],
-            "title": paper["title"],
-            "authors": ", ".join(paper["authors"]),
-            "categories": ", ".join(paper["categories"]),
-            "abstract": paper["abstract"],
-            "published": paper["published"],
-            "updated": paper["updated"]
+        self.paper_meta_table[paper["id"]] = self.paper_metadata(paper)
+        return [Document(page_content=content, metadata=metadata) for content, metadata in self._paper_rows(paper)]
+    
+    @staticmethod
+    def paper_metadata(paper: Dict[str, Any]) -> Dict[str, Any]:
+        """Paper-level metadata, stored once per paper in paper_meta_table instead of on every chunk"""
+        return {
+            "title": paper.get("title", ""),
+            "authors": ", ".join(paper.get("authors") or []),
+            "categories": ", ".join(paper.get("categories") or []),
+            "abstract": paper.get("abstract", ""),
+            "published": paper.get("published", ""),
+            "updated": paper.get("updated", "")
         }
+    
+    def _paper_rows(self, paper: Dict[str, Any]) -> List[Tuple[str, Dict]]:
+        """Chunks of a paper as (page_content, metadata) rows, no Document objects"""
+        rows = []
+        
+        # Chunks only reference their paper; title, authors etc. are joined back from paper_meta_table
+        metadata = {"paper_id": paper["id"]}
         
         # Process each section
         for section_idx, section in enumerate(paper["sections"]):
-            section_metadata = metadata.copy()
-            section_metadata["section_id"] = section_idx
-            
-            # Process section text
-            if section["text"]:
-                text_chunks = self._process_text_section(
-                    section["text"], 
-                    section_metadata,
-                    section_idx
-                )
-                documents.extend(text_chunks)
-            
-            # Process tables
-            if section["tables"]:
-                table_chunks = self._process_tables(
-                    section["tables"],
-                    section_metadata,
-                    section_idx
-                )
-                documents.extend(table_chunks)
-            
-            # Process images
-            if section["images"]:
-                image_chunks = self._process_images(
-                    section["images"],
-                    section_metadata,
-                    section_idx
-                )
-                documents.extend(image_chunks)
+            rows.extend(self._iter_section_rows(section, metadata, section_idx))
         
-        return documents
+        return rows
     
-    def _process_text_section(self, text: str, metadata: Dict, section_idx: int) -> List[Document]:
-        """Processes text section"""
-        if not text.strip():
-            return []
+    def _iter_section_rows(self, section: Dict[str, Any], metadata: Dict, section_idx: int) -> Iterator[Tuple[str, Dict]]:
+        """Yields text, table and image chunks of one section in a single pass"""
+        text = section.get("text") or ""
+        has_text = bool(text.strip())
+        tables = section.get("tables") or {}
+        images = section.get("images") or {}
+        # Nothing to chunk: skip before any metadata is built
+        if not (has_text or tables or images):
+            return
         
-        # Split text into chunks
-        chunks = self.text_splitter.split_text(text)
+        # Section-level metadata and id prefix are built once and shared by every chunk kind.
+        # Text and table ids are content hashes, the same in every paper and build; image ids stay positional
+        section_metadata = {**metadata, "section_id": section_idx}
+        prefix = f"{metadata['paper_id']}_section_{section_idx}_"
         
-        documents = []
-        for chunk_idx, chunk in enumerate(chunks):
-            chunk_metadata = metadata.copy()
-            chunk_metadata.update({
-                "content_type": "text",
-                "chunk_id": f"{metadata['paper_id']}_section_{section_idx}_chunk_{chunk_idx}",
-                "chunk_index": chunk_idx
-            })
-            
-            documents.append(Document(
-                page_content=chunk,
-                metadata=chunk_metadata
-            ))
-        
-        return documents
-    
-    def _process_tables(self, tables: Dict[str, str], metadata: Dict, section_idx: int) -> List[Document]:
-        """Processes tables"""
-        documents = []
+        # Section text
+        if has_text:
+            # Split text into chunks with undersized ones joined (token counts come from the split)
+            chunks, counts = self._split_text(text)
+            for chunk_idx, (chunk, count) in enumerate(zip(chunks, counts)):
+                yield chunk, {
+                    **section_metadata,
+                    "content_type": "text",
+                    "chunk_id": EmbeddingCache.content_hash(chunk),
+                    "chunk_index": chunk_idx,
+                    "token_count": count
+                }
         
+        # Tables
         for table_id, table_content in tables.items():
             if not table_content.strip():
                 continue
-            
-            # Create table description
-            table_text = f"Table {table_id}:\n{table_content}"
-            
-            chunk_metadata = metadata.copy()
-            chunk_metadata.update({
+            content = f"Table {table_id}:\n{table_content}"
+            yield content, {
+                **section_metadata,
                 "content_type": "table",
                 "table_id": table_id,
-                "chunk_id": f"{metadata['paper_id']}_section_{section_idx}_table_{table_id}"
-            })
-            
-            documents.append(Document(
-                page_content=table_text,
-                metadata=chunk_metadata
-            ))
-        
-        return documents
-    
-    def _process_images(self, images: Dict[str, str], metadata: Dict, section_idx: int) -> List[Document]:
-        """Processes images"""
-        documents = []
+                "chunk_id": EmbeddingCache.content_hash(content),
+                "token_count": self.count_tokens(content)
+            }
         
+        # Images
         for image_id, image_content in images.items():
             if not image_content.strip():
                 continue
-            
-            # Create image description
-            image_text = f"Image {image_id}: [Image in base64 format]"
-            
-            chunk_metadata = metadata.copy()
-            chunk_metadata.update({
+            try:
+                image_path, image_hash = self._store_image(image_content)
+            except (binascii.Error, ValueError) as e:
+                logger.warning(f"Skipping undecodable image {prefix}image_{image_id}: {e}")
+                continue
+            content = f"Image {image_id}: [Image file]"
+            yield content, {
+                **section_metadata,
                 "content_type": "image",
                 "image_id": image_id,
-                "chunk_id": f"{metadata['paper_id']}_section_{section_idx}_image_{image_id}",
-                "image_base64": image_content  # Save base64 for further use
-            })
-            
-            documents.append(Document(
-                page_content=image_text,
-                metadata=chunk_metadata
-            ))
-        
-        return documents
+                "chunk_id": f"{prefix}image_{image_id}",
+                "image_uri": str(image_path),
+                "image_sha256": image_hash,
+                "token_count": self.count_tokens(content)
+            }
     
-    def process_corpus(self, papers: List[Dict[str, Any]]) -> List[Document]:
+    def _split_text(self, text: str) -> Tuple[List[str], List[int]]:
         """
-        Processes entire document corpus
+        Cuts text into windows of at most chunk_size tokens (chunk_overlap shared between neighbours),
+        undersized windows joined with a neighbour. The text is encoded once; separators are found with str.rfind on the window's character
+        range instead of re-splitting and re-measuring pieces like a recursive splitter does.
         """
-        all_documents = []
+        # encode_ordinary goes straight to the Rust BPE, without the special-token scan
+        # (same tokens as encode(disallowed_special=()): special tokens count as plain text)
+        tokens = self.encoding.encode_ordinary(text)
+        n = len(tokens)
+        if n <= self.chunk_size:
+            return [text.strip()], [n]
         
-        for paper in papers:
-            try:
-                paper_documents = self.process_paper(paper)
-                all_documents.extend(paper_documents)
-                logger.info(f"Processed paper {paper['id']}: {len(paper_documents)} chunks")
-            except Exception as e:
-                logger.error(f"Error processing paper {paper.get('id', 'unknown')}: {e}")
+        # offsets[i] is the character index where token i starts
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        spans = []
+        start = 0
+        while start < n:
+            end = min(start + self.chunk_size, n)
+            if end < n:
+                lo, hi = offsets[start + (end - start) // 2], offsets[end]
+                for sep in SEPARATORS:
+                    pos = text.rfind(sep, lo, hi)
+                    if pos != -1:
+                        # End before the token holding the split point (tokens often lead with whitespace)
+                        end = max(bisect.bisect_right(offsets, pos + len(sep), start + 1, end) - 1, start + 1)
+                        break
+            spans.append((start, end))
+            if end >= n:
+                break
+            start = max(end - self.chunk_overlap, start + 1)
         
+        chunks, counts = [], []
+        for start, end in self._merge_small(spans):
+            chunk = text[offsets[start]:offsets[end] if end < n else len(text)].strip()
+            if chunk:
+                chunks.append(chunk)
+                counts.append(end - start)
+        return chunks, counts
+    
+    def _merge_small(self, spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        Greedily joins an undersized (start, end) token window with its predecessor while the pair
+        stays within chunk_size. Neighbours overlap, so the joined window just extends the
+        predecessor's end: the shared tokens are neither repeated in the text nor counted twice
+        """
+        merged = []
+        for start, end in spans:
+            if merged and (end - start < self.min_chunk_tokens or merged[-1][1] - merged[-1][0] < self.min_chunk_tokens) \
+                    and end - merged[-1][0] <= self.chunk_size:
+                merged[-1] = (merged[-1][0], end)
+            else:
+                merged.append((start, end))
+        return merged
+    
+    def _store_image(self, image_base64: str) -> Tuple[Path, str]:
+        """Decodes base64 and writes the image once under its sha256"""
+        data = base64.b64decode(image_base64, validate=True)
+        digest = hashlib.sha256(data).hexdigest()
+        ext = next((ext for magic, ext in IMAGE_EXTENSIONS if data.startswith(magic)), ".bin")
+        path = self.image_store_dir / f"{digest}{ext}"
+        if not path.exists():
+            self.image_store_dir.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        return path, digest
+    
+    @staticmethod
+    def get_image(image_uri: str) -> mmap.mmap:
+        """Maps a stored image read-only without copying it (close the map when done)"""
+        with open(image_uri, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def process_corpus(self, papers: List[Dict[str, Any]], n_workers: Optional[int] = None) -> List[Document]:
+        """
+        Processes entire document corpus
+        """
+        all_documents = list(self.iter_corpus(papers, n_workers))
         logger.info(f"Total created {len(all_documents)} chunks from {len(papers)} papers")
         return all_documents
     
-    def get_document_stats(self, documents: List[Document]) -> Dict[str, Any]:
+    def iter_corpus(self, papers: List[Dict[str, Any]], n_workers: Optional[int] = None) -> Iterator[Document]:
+        """
+        Yields chunks paper by paper, so callers can index them without holding the whole corpus
+        """
+        for content, metadata in self.iter_corpus_rows(papers, n_workers):
+            yield Document(page_content=content, metadata=metadata)
+    
+    def iter_corpus_rows(self, papers: List[Dict[str, Any]], n_workers: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Same as iter_corpus but yields (page_content, metadata) rows, for ingestion paths that
+        go straight to column batches without building a Document per chunk.
+        Splitting is CPU-bound, so papers are spread over n_workers processes (default: all cores).
+        """
+        n_workers = n_workers or os.cpu_count() or 1
+        if n_workers > 1 and len(papers) >= MIN_PARALLEL_PAPERS:
+            # Workers return plain rows, cheaper to pickle than Documents
+            chunksize = max(1, min(len(papers) // (n_workers * 4), MAX_PAPERS_PER_TASK))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                yield from self._iter_results(papers, self._iter_pool_results(executor, papers, chunksize, n_workers * TASKS_PER_WORKER))
+        else:
+            yield from self._iter_results(papers, (_process_paper(self, paper) for paper in papers))
+    
+    def _iter_pool_results(self, executor: ProcessPoolExecutor, papers: List[Dict[str, Any]],
+                           chunksize: int, max_pending: int) -> Iterator[Tuple[List[Tuple[str, Dict]], Optional[str]]]:
+        """
+        Per-paper results in corpus order. Unlike executor.map, which submits the whole corpus at
+        once, at most max_pending tasks are queued, so results of a consumer that is busy embedding
+        do not pile up in memory.
+        """
+        settings = (self.chunk_size, self.chunk_overlap, str(self.image_store_dir))
+        tasks = (papers[start:start + chunksize] for start in range(0, len(papers), chunksize))
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_process_papers_worker, task, *settings))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    
+    def _iter_results(self, papers: List[Dict[str, Any]], results: Iterable) -> Iterator[Tuple[str, Dict]]:
+        # Stats are counted as chunks go by, so nobody needs a second pass over them
+        content_types: Counter = Counter()
+        paper_ids = set()
+        total_chunks = total_length = 0
+        try:
+            for paper, (chunks, error) in zip(papers, results):
+                if error is not None:
+                    logger.error(f"Error processing paper {paper.get('id', 'unknown')}: {error}")
+                    continue
+                # Filled here, in the parent process, so it is complete whichever process chunked the paper
+                self.paper_meta_table[paper["id"]] = self.paper_metadata(paper)
+                for content, metadata in chunks:
+                    content_types[metadata.get("content_type", "unknown")] += 1
+                    paper_ids.add(metadata.get("paper_id", ""))
+                    total_length += len(content)
+                    total_chunks += 1
+                    yield content, metadata
+                logger.info(f"Processed paper {paper['id']}: {len(chunks)} chunks")
+        finally:
+            self.last_stats = {
+                "total_chunks": total_chunks,
+                "content_types": dict(content_types),
+                "papers_count": len(paper_ids),
+                "avg_chunk_length": total_length / total_chunks if total_chunks else 0
+            }
+    
+    def get_document_stats(self, documents: Optional[List[Document]] = None) -> Dict[str, Any]:
         """
-        Returns document statistics
+        Returns document statistics; without documents, those of the last processed corpus
         """
+        if documents is None:
+            return self.last_stats or {"total_chunks": 0, "content_types": {}, "papers_count": 0, "avg_chunk_length": 0}
+        
         stats = {
             "total_chunks": len(documents),
             "content_types": {},
@@ -186,3 +327,26 @@ class DocumentProcessor:
             stats["avg_chunk_length"] = total_length / len(documents)
         
         return stats
+
+
+# Per-process processor, built once per worker instead of once per paper
+_worker_processor: Optional[DocumentProcessor] = None
+_worker_processor_settings: Optional[Tuple[int, int, str]] = None
+
+def _process_paper(processor: DocumentProcessor, paper: Dict[str, Any]) -> Tuple[List[Tuple[str, Dict]], Optional[str]]:
+    """Returns (chunks as (page_content, metadata) tuples, error message or None)"""
+    try:
+        return processor._paper_rows(paper), None
+    except Exception as e:
+        return [], str(e)
+
+def _process_paper_worker(paper: Dict[str, Any], chunk_size: int, chunk_overlap: int, image_store_dir: str):
+    global _worker_processor, _worker_processor_settings
+    settings = (chunk_size, chunk_overlap, image_store_dir)
+    if _worker_processor is None or _worker_processor_settings != settings:
+        _worker_processor = DocumentProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap, image_store_dir=image_store_dir)
+        _worker_processor_settings = settings
+    return _process_paper(_worker_processor, paper)
+
+def _process_papers_worker(papers: List[Dict[str, Any]], chunk_size: int, chunk_overlap: int, image_store_dir: str):
+    return [_process_paper_worker(paper, chunk_size, chunk_overlap, image_store_dir) for paper in papers]
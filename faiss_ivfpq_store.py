@@ -0,0 +1,445 @@
+"""
+Faiss IVF-PQ storage backend for the RAG system (VECTOR_BACKEND=faiss): ~32x smaller vectors than
+Chroma's fp32 HNSW for collections beyond ~1M chunks. Chunk text and metadata live in SQLite, keyed by faiss id.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import faiss
+import numpy as np
+import orjson
+from langchain.schema import Document
+
+from vector_store import BaseVectorStore, ChunkBatch
+
+logger = logging.getLogger(__name__)
+
+# Bits per PQ sub-quantizer code (256 centroids each)
+PQ_NBITS = 8
+# Below this many vectors the exact flat index is kept: too few points to train the coarse and PQ codebooks
+# (faiss wants ~39 per centroid: 256 PQ centroids -> ~10k)
+MIN_IVFPQ_VECTORS = 10_000
+# The index is written to disk once this many vectors were added since the last write: chunk rows are committed
+# batch by batch, so an interrupted load loses at most these (their rows are dropped on the next open)
+CHECKPOINT_VECTORS = 50_000
+# Metadata fields searches and gets can filter on (equality only)
+_FILTER_FIELDS = ("paper_id", "content_type")
+
+
+def _pq_subquantizers(dim: int, pq_m: int) -> int:
+    """Largest sub-quantizer count <= pq_m that divides dim"""
+    return next(m for m in range(min(pq_m, dim), 0, -1) if dim % m == 0)
+
+
+class FaissIVFPQStore(BaseVectorStore):
+    """
+    Same public API as the Chroma VectorStore, without its int8 side index. Vectors go to an exact flat
+    index until train_size of them (or MIN_IVFPQ_VECTORS by finalize_load) are stored, which then train
+    an IVF-PQ index that holds all of them.
+    """
+
+    def __init__(self,
+                 collection_name: str = "arxiv_papers",
+                 persist_directory: str = "data/vector_db",
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 embedding_cache_dir: Optional[str] = None,
+                 onnx_model_path: Optional[str] = None,
+                 compile_model: bool = False,
+                 nlist: int = 4096,
+                 pq_m: int = 48,
+                 nprobe: int = 32,
+                 train_size: int = 100_000):
+
+        self.collection_name = collection_name
+        self.persist_directory = persist_directory
+        self.embedding_model_name = embedding_model
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.nprobe = nprobe
+        self.train_size = train_size
+        os.makedirs(persist_directory, exist_ok=True)
+
+        self._init_embedder(embedding_model, embedding_cache_dir, onnx_model_path, compile_model)
+        self.dim = self.embedding_model.get_sentence_embedding_dimension()
+        # Faiss indexes are not safe to search while being added to: one lock for both
+        self._write_lock = threading.RLock()
+
+        self.index_path = os.path.join(persist_directory, f"{collection_name}.faiss")
+        self.db_path = os.path.join(persist_directory, f"{collection_name}_chunks.sqlite")
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (faiss_id INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+                "document TEXT, metadata TEXT, paper_id TEXT, content_type TEXT)"
+            )
+            for name in _FILTER_FIELDS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS chunks_{name} ON chunks ({name})")
+            # Papers whose duplicate chunks were dropped in favour of a chunk of another paper
+            conn.execute("CREATE TABLE IF NOT EXISTS chunk_aliases (id TEXT, paper_id TEXT, PRIMARY KEY (id, paper_id))")
+            conn.execute("CREATE INDEX IF NOT EXISTS chunk_aliases_paper_id ON chunk_aliases (paper_id)")
+        # Changed since the index was last written to disk, and vectors added since then
+        self._dirty = False
+        self._unpersisted = 0
+        self.index = self._load_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _new_flat_index(self):
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+
+    def _load_index(self):
+        """Persisted index, or an empty flat one, synced with the chunk table"""
+        index = faiss.read_index(self.index_path) if os.path.exists(self.index_path) else self._new_flat_index()
+        if index.ntotal != self._row_count():
+            self._sync_with_rows(index)
+        if isinstance(index, faiss.IndexIVF):
+            index.nprobe = self.nprobe
+        logger.info(f"Faiss index {self.collection_name}: {index.ntotal} vectors")
+        return index
+
+    def _sync_with_rows(self, index) -> None:
+        """
+        After an interrupted load: drops the chunk rows added since the index was last written,
+        and vectors whose row is missing. Everything both sides have is kept.
+        """
+        indexed = self._index_ids(index)
+        with closing(self._connect()) as conn, conn:
+            rows = np.fromiter((row[0] for row in conn.execute("SELECT faiss_id FROM chunks")), dtype=np.int64)
+            stale_rows = np.setdiff1d(rows, indexed)
+            conn.executemany("DELETE FROM chunks WHERE faiss_id = ?", ((int(faiss_id),) for faiss_id in stale_rows))
+            conn.execute("DELETE FROM chunk_aliases WHERE id NOT IN (SELECT id FROM chunks)")
+        orphans = np.setdiff1d(indexed, rows)
+        if len(orphans):
+            index.remove_ids(faiss.IDSelectorBatch(len(orphans), faiss.swig_ptr(orphans)))
+            self._dirty = True
+        logger.warning(f"Faiss index and chunk table of {self.collection_name} were out of sync (interrupted load?): "
+                       f"dropped {len(stale_rows)} unindexed chunks and {len(orphans)} vectors without a chunk")
+
+    @staticmethod
+    def _index_ids(index) -> np.ndarray:
+        """Faiss ids stored in a flat IDMap or IVF index"""
+        if not isinstance(index, faiss.IndexIVF):
+            return faiss.vector_to_array(index.id_map)
+        invlists = index.invlists
+        return np.concatenate([np.empty(0, dtype=np.int64)] + [
+            faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+            for list_no in range(index.nlist) if invlists.list_size(list_no)
+        ])
+
+    def _row_count(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def _is_flat(self) -> bool:
+        return not isinstance(self.index, faiss.IndexIVF)
+
+    def _train_ivfpq(self) -> None:
+        """Moves every vector of the flat index into a new IVF-PQ index trained on a sample of them"""
+        flat = faiss.downcast_index(self.index.index)
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+        ids = faiss.vector_to_array(self.index.id_map)
+
+        n_lists = max(1, min(self.nlist, len(vectors) // 39))
+        m = _pq_subquantizers(self.dim, self.pq_m)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(self.dim), self.dim, n_lists, m, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        sample = np.random.default_rng(0).choice(len(vectors), min(len(vectors), self.train_size), replace=False)
+        logger.info(f"Training IVF-PQ (nlist={n_lists}, m={m}) on {len(sample)} of {len(vectors)} vectors")
+        index.train(vectors[sample])
+        index.add_with_ids(vectors, ids)
+        index.nprobe = self.nprobe
+        self.index = index
+        self._dirty = True
+
+    def persist(self) -> None:
+        """Writes the index to disk if it changed"""
+        with self._write_lock:
+            if self._dirty:
+                # Written aside and renamed, so an interrupted write leaves the previous index intact
+                tmp_path = f"{self.index_path}.tmp"
+                faiss.write_index(self.index, tmp_path)
+                os.replace(tmp_path, self.index_path)
+                self._dirty = False
+                self._unpersisted = 0
+
+    def finalize_load(self) -> None:
+        """Trains IVF-PQ once the collection is large enough, then persists the index"""
+        with self._write_lock:
+            if self._is_flat() and self.index.ntotal >= MIN_IVFPQ_VECTORS:
+                self._train_ivfpq()
+            self.persist()
+
+    def configure_hnsw_params(self) -> Dict[str, int]:
+        """No HNSW graph here: the IVF-PQ search setting, so callers can tune either backend alike"""
+        return {"nprobe": self.nprobe}
+
+    def count(self) -> int:
+        return self.index.ntotal
+
+    def add_documents(self, documents: List[Document], batch_size: Optional[int] = None) -> None:
+        super().add_documents(documents, batch_size)
+        self.finalize_load()
+
+    def _write(self, batch: ChunkBatch, embeddings: Optional[np.ndarray], batch_size: Optional[int]) -> None:
+        """Adds an embedded batch; ids already stored are skipped, as Chroma's add does"""
+        if embeddings is None:
+            raise ValueError("FaissIVFPQStore needs precomputed embeddings")
+        try:
+            with self._write_lock:
+                self._add_rows(batch, embeddings)
+                # After the rows are committed, so a written index never holds vectors without a chunk
+                if self._unpersisted >= CHECKPOINT_VECTORS:
+                    self.persist()
+        except Exception as e:
+            logger.error(f"Error adding documents: {e}")
+            raise
+
+    def _add_rows(self, batch: ChunkBatch, embeddings: np.ndarray) -> None:
+        """Commits the rows of the new chunks of batch and adds their vectors to the in-memory index"""
+        with closing(self._connect()) as conn, conn:
+            existing = self.existing_ids(batch.ids)
+            # First occurrence of each new id
+            positions = []
+            for i, chunk_id in enumerate(batch.ids):
+                if chunk_id not in existing:
+                    existing.add(chunk_id)
+                    positions.append(i)
+            if not positions:
+                return
+
+            first_id = conn.execute("SELECT COALESCE(MAX(faiss_id), -1) + 1 FROM chunks").fetchone()[0]
+            faiss_ids = np.arange(first_id, first_id + len(positions), dtype=np.int64)
+            conn.executemany(
+                "INSERT INTO chunks (faiss_id, id, document, metadata, paper_id, content_type) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (int(faiss_id), batch.ids[i], batch.texts[i], orjson.dumps(batch.metadatas[i]).decode(),
+                     batch.metadatas[i].get("paper_id"), batch.metadatas[i].get("content_type"))
+                    for faiss_id, i in zip(faiss_ids, positions)
+                ]
+            )
+            self.index.add_with_ids(np.ascontiguousarray(embeddings[positions], dtype=np.float32), faiss_ids)
+            self._dirty = True
+            self._unpersisted += len(positions)
+            if self._is_flat() and self.index.ntotal >= self.train_size:
+                self._train_ivfpq()
+        logger.info(f"Added {len(positions)} documents to collection")
+
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        """Those of ids already stored"""
+        existing = set()
+        with closing(self._connect()) as conn:
+            for start in range(0, len(ids), 500):
+                chunk_ids = ids[start:start + 500]
+                existing.update(row[0] for row in conn.execute(
+                    f"SELECT id FROM chunks WHERE id IN ({','.join('?' * len(chunk_ids))})", chunk_ids
+                ))
+        return existing
+
+    def stored_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of those of ids already stored, by id"""
+        stored = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(ids), 500):
+                chunk_ids = ids[start:start + 500]
+                stored.update((chunk_id, orjson.loads(metadata)) for chunk_id, metadata in conn.execute(
+                    f"SELECT id, metadata FROM chunks WHERE id IN ({','.join('?' * len(chunk_ids))})", chunk_ids
+                ))
+        return stored
+
+    def add_paper_aliases(self, aliases: Dict[str, List[str]]) -> None:
+        if not aliases:
+            return
+        with self._write_lock:
+            updates = self._merge_aliases(self.stored_metadatas(list(aliases)), aliases)
+            if not updates:
+                return
+            self.update_metadatas(list(updates), [{"alias_paper_ids": ", ".join(ids)} for ids in updates.values()])
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO chunk_aliases (id, paper_id) VALUES (?, ?)",
+                    [(chunk_id, paper_id) for chunk_id, ids in updates.items() for paper_id in ids]
+                )
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Merges metadatas into existing rows (keys not given are kept)
+        """
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            for chunk_id, update in zip(ids, metadatas):
+                row = conn.execute("SELECT metadata FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+                if row is None:
+                    continue
+                metadata = {**orjson.loads(row[0]), **update}
+                conn.execute(
+                    "UPDATE chunks SET metadata = ?, paper_id = ?, content_type = ? WHERE id = ?",
+                    (orjson.dumps(metadata).decode(), metadata.get("paper_id"), metadata.get("content_type"), chunk_id)
+                )
+
+    @staticmethod
+    def _where_field(where: Optional[Dict]) -> Optional[Tuple[str, Any]]:
+        """(field, value) of a single-field equality filter on paper_id / content_type"""
+        if where is None:
+            return None
+        if len(where) == 1:
+            field, value = next(iter(where.items()))
+            if isinstance(value, dict) and list(value) == ["$eq"]:
+                value = value["$eq"]
+            if field in _FILTER_FIELDS and not isinstance(value, dict):
+                return field, value
+        raise ValueError(f"FaissIVFPQStore only filters on equality of one of {_FILTER_FIELDS}, got {where}")
+
+    def _search_params(self, where: Optional[Dict]):
+        """Faiss search parameters restricting hits to faiss ids matching where (None: unfiltered); False: no match"""
+        field_value = self._where_field(where)
+        if field_value is None:
+            return None
+        field, value = field_value
+        with closing(self._connect()) as conn:
+            ids = np.fromiter((row[0] for row in conn.execute(self._where_sql("faiss_id", field), self._where_args(field, value))),
+                              dtype=np.int64)
+        if not len(ids):
+            return False
+        selector = faiss.IDSelectorBatch(len(ids), faiss.swig_ptr(ids))
+        # The selector reads from ids, keep it alive with the parameters
+        selector.ids_array = ids
+        if self._is_flat():
+            return faiss.SearchParameters(sel=selector)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=self.nprobe)
+
+    def _search_vectors(self, query_embeddings: np.ndarray, n_results: int,
+                        where: Optional[Dict]) -> List[List[Dict[str, Any]]]:
+        """Top n_results per query embedding, as search() returns them"""
+        with self._write_lock:
+            k = min(n_results, self.index.ntotal)
+            params = self._search_params(where)
+            if k <= 0 or params is False:
+                return [[] for _ in query_embeddings]
+            queries = np.ascontiguousarray(query_embeddings, dtype=np.float32)
+            if params is None:
+                scores, labels = self.index.search(queries, k)
+            else:
+                scores, labels = self.index.search(queries, k, params=params)
+
+        hit_ids = sorted({int(label) for label in labels.ravel() if label >= 0})
+        rows = self._rows_by_faiss_id(hit_ids)
+        return [
+            [
+                {**rows[int(label)], 'distance': 1.0 - float(score)} # cosine distance
+                for score, label in zip(row_scores, row_labels) if int(label) in rows
+            ]
+            for row_scores, row_labels in zip(scores, labels)
+        ]
+
+    def _rows_by_faiss_id(self, faiss_ids: Sequence[int]) -> Dict[int, Dict[str, Any]]:
+        rows = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(faiss_ids), 500):
+                chunk = faiss_ids[start:start + 500]
+                for faiss_id, chunk_id, document, metadata in conn.execute(
+                    f"SELECT faiss_id, id, document, metadata FROM chunks WHERE faiss_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ):
+                    rows[faiss_id] = {'content': document, 'metadata': orjson.loads(metadata), 'id': chunk_id}
+        return rows
+
+    def search(self,
+               query: str,
+               n_results: int = 5,
+               where: Optional[Dict] = None,
+               query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """
+        Performs search in vector storage; query_embedding skips encoding the query
+        """
+        if query_embedding is None:
+            query_embedding = self.embed_query(query)
+        return self._search_vectors(np.asarray([query_embedding], dtype=np.float32), n_results, where)[0]
+
+    def search_batch(self,
+                     queries: List[str],
+                     n_results: int = 5,
+                     wheres: Optional[List[Optional[Dict]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Performs several searches with one embedding pass; queries sharing a filter go in one index search
+        """
+        if not queries:
+            return []
+        wheres = wheres or [None] * len(queries)
+
+        embeddings = self._encode(queries).astype(np.float32)
+
+        groups: Dict[str, List[int]] = {}
+        for i, where in enumerate(wheres):
+            groups.setdefault(repr(where), []).append(i)
+
+        all_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for positions in groups.values():
+            group_results = self._search_vectors(embeddings[positions], n_results, wheres[positions[0]])
+            for i, results in zip(positions, group_results):
+                all_results[i] = results
+
+        return all_results
+
+    def get_collection_info(self) -> Dict[str, Any]:
+        """
+        Returns collection information
+        """
+        return {
+            "collection_name": self.collection_name,
+            "document_count": self.count(),
+            "embedding_model": self.embedding_model_name,
+            "persist_directory": self.persist_directory
+        }
+
+    def delete_collection(self) -> None:
+        """
+        Deletes collection
+        """
+        with self._write_lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM chunks")
+            conn.execute("DELETE FROM chunk_aliases")
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self.index = self._new_flat_index()
+            self._dirty = False
+        logger.info(f"Collection {self.collection_name} deleted")
+
+    def reset_collection(self) -> None:
+        """
+        Resets collection (deletes and creates new one)
+        """
+        self.delete_collection()
+        logger.info(f"Collection {self.collection_name} reset")
+
+    @staticmethod
+    def _where_sql(columns: str, field: str) -> str:
+        """SELECT of columns of the chunks whose field equals the bound value; paper_id also matches aliases"""
+        if field == "paper_id":
+            return (f"SELECT {columns} FROM chunks WHERE paper_id = ? OR id IN "
+                    f"(SELECT id FROM chunk_aliases WHERE paper_id = ?) ORDER BY faiss_id")
+        return f"SELECT {columns} FROM chunks WHERE {field} = ? ORDER BY faiss_id"
+
+    @staticmethod
+    def _where_args(field: str, value: Any) -> Tuple[Any, ...]:
+        return (value, value) if field == "paper_id" else (value,)
+
+    def _get_where(self, field: str, value: str) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            return [
+                {'content': document, 'metadata': orjson.loads(metadata), 'id': chunk_id}
+                for chunk_id, document, metadata in conn.execute(
+                    self._where_sql("id, document, metadata", field), self._where_args(field, value)
+                )
+            ]
+
+    def count_by_content_type(self, content_type: str) -> int:
+        """
+        Counts documents of given content type without fetching their contents
+        """
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM chunks WHERE content_type = ?", (content_type,)).fetchone()[0]
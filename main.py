@@ -6,7 +6,7 @@ import logging
 from dotenv import load_dotenv
 
 from rag_system import RAGSystem
-from config import Config
+from core.config import Config
 from core.rag_agent import RAGAgent
 
 # Load environment variables
@@ -36,7 +36,7 @@ def main():
         if not question:
             continue
         print("\nAnswer:")
-        print(agent.answer(question))
+        print(agent.ask(question))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,50 @@
+"""
+Sentence embeddings from an INT8-quantized ONNX export of the model (pip install onnxruntime).
+
+One-time conversion:
+    optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2 onnx/
+    python -c "from onnx_embedder import quantize_onnx_model; quantize_onnx_model('onnx/model.onnx', 'onnx/model.int8.onnx')"
+"""
+import os
+from typing import List
+
+import numpy as np
+
+
+def quantize_onnx_model(model_path: str, output_path: str) -> None:
+    """Dynamic INT8 quantization of the exported model's weights (int8 MatMul on VNNI CPUs)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+
+
+class OnnxEmbedder:
+    """Drop-in for the SentenceTransformer calls VectorStore makes: mean pooling + L2 normalization in NumPy"""
+
+    def __init__(self, model_path: str, max_length: int = 256):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        # optimum-cli writes the tokenizer files next to the model
+        self.tokenizer = AutoTokenizer.from_pretrained(os.path.dirname(model_path) or ".")
+        self.session = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_length = max_length
+        self._dim = self._forward(["dimension probe"]).shape[1]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dim
+
+    def _forward(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        hidden = self.session.run(None, inputs)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, texts: List[str], batch_size: int = 32, normalize_embeddings: bool = False, **_) -> np.ndarray:
+        vectors = np.concatenate([self._forward(texts[start:start + batch_size])
+                                  for start in range(0, len(texts), batch_size)]).astype(np.float32)
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        return vectors
@@ -0,0 +1,71 @@
+"""
+Payload index for the Chroma collection: chunk id -> paper_id / content_type in SQLite, indexed on both
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+class PayloadIndex:
+    """Answers the paper_id / content_type lookups that a Chroma `where` get would scan for"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS payload (id TEXT PRIMARY KEY, paper_id TEXT, content_type TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS payload_paper_id ON payload (paper_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS payload_content_type ON payload (content_type)")
+            # Papers whose duplicate chunks were dropped in favour of a chunk of another paper
+            conn.execute("CREATE TABLE IF NOT EXISTS payload_alias (id TEXT, paper_id TEXT, PRIMARY KEY (id, paper_id))")
+            conn.execute("CREATE INDEX IF NOT EXISTS payload_alias_paper_id ON payload_alias (paper_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, ids: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO payload (id, paper_id, content_type) VALUES (?, ?, ?)",
+                [(chunk_id, m.get("paper_id"), m.get("content_type")) for chunk_id, m in zip(ids, metadatas)]
+            )
+
+    def add_aliases(self, pairs: Sequence[Tuple[str, str]]) -> None:
+        """(chunk id, paper_id) pairs of chunks that also stand for another paper"""
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany("INSERT OR IGNORE INTO payload_alias (id, paper_id) VALUES (?, ?)", pairs)
+    
+    def ids_where(self, field: str, value: str) -> List[str]:
+        """Chunk ids whose `field` ('paper_id' | 'content_type') equals value; paper_id also matches aliases"""
+        if field not in ("paper_id", "content_type"):
+            raise ValueError(f"Field {field} is not indexed")
+        with closing(self._connect()) as conn:
+            if field == "paper_id":
+                rows = conn.execute(
+                    "SELECT id FROM payload WHERE paper_id = ? UNION SELECT id FROM payload_alias WHERE paper_id = ?",
+                    (value, value)
+                )
+            else:
+                rows = conn.execute(f"SELECT id FROM payload WHERE {field} = ?", (value,))
+            return [row[0] for row in rows]
+
+    def count_where(self, field: str, value: str) -> int:
+        if field not in ("paper_id", "content_type"):
+            raise ValueError(f"Field {field} is not indexed")
+        with closing(self._connect()) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM payload WHERE {field} = ?", (value,)).fetchone()[0]
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM payload").fetchone()[0]
+
+    def reset(self) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM payload")
+            conn.execute("DELETE FROM payload_alias")
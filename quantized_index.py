@@ -0,0 +1,132 @@
+"""
+Int8 sidecar index for the Chroma collection: per-vector symmetric int8 codes in a flat file,
+chunk id -> row in SQLite
+"""
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Rows scored per einsum call, bounds the int32 score buffer
+_SEARCH_BLOCK = 65536
+
+
+def quantize(vectors) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    L2-normalizes rows and maps them to int8 with one symmetric scale per row.
+    Returns (codes (n, dim) int8, scales (n,) fp32); codes * scale ~ unit vector.
+    """
+    v = np.asarray(vectors, dtype=np.float32)
+    v = v / (np.linalg.norm(v, axis=1, keepdims=True) + 1e-12)
+    scale = np.abs(v).max(axis=1, keepdims=True) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.round(v / scale).astype(np.int8)
+    return codes, scale.squeeze(1)
+
+
+class Int8VectorIndex:
+    """Exact cosine search over int8 codes, 4x less data to scan than the fp32 vectors"""
+
+    def __init__(self, index_dir: str, dim: int):
+        self.dim = dim
+        self.index_dir = index_dir
+        os.makedirs(index_dir, exist_ok=True)
+        self.codes_path = os.path.join(index_dir, "codes.i8")
+        self.scales_path = os.path.join(index_dir, "scales.f32")
+        self.db_path = os.path.join(index_dir, "rows.sqlite")
+        self._lock = threading.Lock()
+        # (ids, content_types, live row mask) of all rows, loaded on first search
+        self._rows: Optional[Tuple[List[str], np.ndarray, np.ndarray]] = None
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS rows (id TEXT PRIMARY KEY, row INTEGER NOT NULL, content_type TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path)
+
+    def _row_count(self) -> int:
+        if not os.path.exists(self.scales_path):
+            return 0
+        return os.path.getsize(self.scales_path) // 4
+
+    def __len__(self) -> int:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def add(self, ids: Sequence[str], codes: np.ndarray, scales: np.ndarray,
+            content_types: Sequence[Optional[str]]) -> None:
+        """Appends codes; re-added ids point to their new row"""
+        if not ids:
+            return
+        if codes.shape != (len(ids), self.dim):
+            raise ValueError(f"Expected codes of shape {(len(ids), self.dim)}, got {codes.shape}")
+        with self._lock:
+            first_row = self._row_count()
+            with open(self.codes_path, "ab") as f:
+                f.write(np.ascontiguousarray(codes, dtype=np.int8).tobytes())
+            with open(self.scales_path, "ab") as f:
+                f.write(np.asarray(scales, dtype=np.float32).tobytes())
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO rows (id, row, content_type) VALUES (?, ?, ?)",
+                    [(chunk_id, first_row + i, ct) for i, (chunk_id, ct) in enumerate(zip(ids, content_types))]
+                )
+            self._rows = None
+
+    def _load_rows(self, n_rows: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        if self._rows is None or len(self._rows[0]) != n_rows:
+            ids: List[str] = [""] * n_rows
+            content_types = np.empty(n_rows, dtype=object)
+            live = np.zeros(n_rows, dtype=bool)
+            with closing(self._connect()) as conn:
+                for chunk_id, row, ct in conn.execute("SELECT id, row, content_type FROM rows"):
+                    if row < n_rows:
+                        ids[row] = chunk_id
+                        content_types[row] = ct
+                        live[row] = True
+            self._rows = (ids, content_types, live)
+        return self._rows
+
+    def search(self, query_vectors, k: int,
+               content_type: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """Returns the top-k (id, cosine similarity) per query, optionally within one content_type"""
+        n_queries = len(query_vectors)
+        with self._lock:
+            n_rows = self._row_count()
+            if n_rows == 0 or k <= 0:
+                return [[] for _ in range(n_queries)]
+            ids, content_types, live = self._load_rows(n_rows)
+        mask = live if content_type is None else live & (content_types == content_type)
+        if not mask.any():
+            return [[] for _ in range(n_queries)]
+
+        codes = np.memmap(self.codes_path, dtype=np.int8, mode="r", shape=(n_rows, self.dim))
+        scales = np.fromfile(self.scales_path, dtype=np.float32, count=n_rows)
+        q_codes, q_scales = quantize(query_vectors)
+
+        # int8 x int8 dot products accumulated in int32, rescaled to fp32 similarities
+        scores = np.empty((n_queries, n_rows), dtype=np.float32)
+        for start in range(0, n_rows, _SEARCH_BLOCK):
+            end = min(start + _SEARCH_BLOCK, n_rows)
+            dots = np.einsum("qd,nd->qn", q_codes, codes[start:end], dtype=np.int32)
+            scores[:, start:end] = dots * q_scales[:, None] * scales[None, start:end]
+        scores[:, ~mask] = -np.inf
+
+        k = min(k, int(mask.sum()))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for qi in range(n_queries):
+            rows = top[qi][np.argsort(-scores[qi, top[qi]])]
+            results.append([(ids[row], float(scores[qi, row])) for row in rows])
+        return results
+
+    def reset(self) -> None:
+        with self._lock:
+            for path in (self.codes_path, self.scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM rows")
+            self._rows = None
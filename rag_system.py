@@ -1,22 +1,41 @@
 """
 Main RAG system class
 """
+import asyncio
+import copy
+import hashlib
 import os
-from typing import List, Dict, Any, Optional
+import numpy as np
+import orjson
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from langchain.schema import Document
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 import logging
 
-from config import Config
+from core.config import Config
+from core.http_clients import http_client, async_http_client, run_async
+from core.query_cache import QueryCache
 from data_loader import OpenRAGDataLoader
-from document_processor import DocumentProcessor
-from vector_store import VectorStore
+from document_processor import DocumentProcessor, PAPER_FIELDS
+from vector_store import BaseVectorStore, ChunkBatch, VectorStore
 
 logger = logging.getLogger(__name__)
 
+# Kept short: every prompt token is paid again on each question. The instructions are an identical
+# system message on every call, so providers that cache prompt prefixes can reuse them
+ANSWER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Answer the question in English using only the numbered context documents; cite them as [n]. "
+               "If the context does not contain the answer, say so."),
+    ("human", "Context:\n{context}\n\nQuestion: {question}\nAnswer:"),
+])
+
+# Paper-level metadata side table, persisted next to the vector DB (chunks only carry paper_id)
+PAPER_META_FILE = "paper_metadata.json"
+
 class RAGSystem:
     """Main RAG system class"""
     
@@ -27,85 +46,227 @@ class RAGSystem:
         self.data_loader = OpenRAGDataLoader(self.config.DATA_DIR)
         self.document_processor = DocumentProcessor(
             chunk_size=self.config.CHUNK_SIZE,
-            chunk_overlap=self.config.CHUNK_OVERLAP
-        )
-        self.vector_store = VectorStore(
-            collection_name=self.config.COLLECTION_NAME,
-            persist_directory=self.config.VECTOR_DB_PATH,
-            embedding_model=self.config.EMBEDDING_MODEL
+            chunk_overlap=self.config.CHUNK_OVERLAP,
+            image_store_dir=self.config.IMAGE_STORE_DIR
         )
+        self.vector_store = self._create_vector_store()
+        
+        self.paper_meta_path = os.path.join(self.config.VECTOR_DB_PATH, PAPER_META_FILE)
+        self._load_paper_meta()
         
         # Initialize language model
         if self.config.OPENAI_API_KEY:
             self.llm = ChatOpenAI(
                 model=self.config.LLM_MODEL,
                 api_key=self.config.OPENAI_API_KEY,
-                temperature=0.1
+                temperature=0.1,
+                http_client=http_client,
+                http_async_client=async_http_client
             )
+            # Repeated prompts (same question and context) are answered from disk; the cache is process-wide
+            if self.config.LLM_CACHE_PATH:
+                os.makedirs(os.path.dirname(self.config.LLM_CACHE_PATH) or ".", exist_ok=True)
+                set_llm_cache(SQLiteCache(database_path=self.config.LLM_CACHE_PATH))
         else:
             logger.warning("OpenAI API key not found. Use local model.")
             self.llm = None
         
+        # search_documents results: value is (query embedding, (n_results, content_type), results)
+        self._search_cache = QueryCache(max_size=self.config.CACHE_SIZE, ttl=self.config.CACHE_TTL)
+        # ask_question results, checked before any embedding, search or LLM call
+        self._answer_cache = QueryCache(max_size=self.config.CACHE_SIZE, ttl=self.config.CACHE_TTL)
+        
         # Create prompt template for answer generation
         self.prompt_template = self._create_prompt_template()
+        # Built once and reused by every generate_answer call
+        self.chain = self._build_chain() if self.llm else None
+    
+    def _create_vector_store(self) -> BaseVectorStore:
+        """Chroma or Faiss IVF-PQ storage, by VECTOR_BACKEND"""
+        store_kwargs = dict(
+            collection_name=self.config.COLLECTION_NAME,
+            persist_directory=self.config.VECTOR_DB_PATH,
+            embedding_model=self.config.ST_EMBEDDING_MODEL,
+            embedding_cache_dir=self.config.ST_EMBEDDING_CACHE_PATH,
+            onnx_model_path=self.config.ONNX_EMBEDDING_MODEL_PATH or None,
+            compile_model=self.config.COMPILE_EMBEDDING_MODEL
+        )
+        if self.config.VECTOR_BACKEND == "faiss":
+            from faiss_ivfpq_store import FaissIVFPQStore
+            return FaissIVFPQStore(
+                **store_kwargs,
+                nlist=self.config.FAISS_NLIST,
+                pq_m=self.config.FAISS_PQ_M,
+                nprobe=self.config.FAISS_NPROBE,
+                train_size=self.config.FAISS_TRAIN_SIZE
+            )
+        if self.config.VECTOR_BACKEND != "chroma":
+            raise ValueError(f"Unknown VECTOR_BACKEND '{self.config.VECTOR_BACKEND}', expected chroma or faiss")
+        return VectorStore(
+            **store_kwargs,
+            quantization=self.config.VECTOR_QUANTIZATION,
+            hnsw_params={
+                "M": self.config.CHROMA_HNSW_M,
+                "construction_ef": self.config.CHROMA_CONSTRUCTION_EF,
+                "search_ef": self.config.CHROMA_SEARCH_EF
+            },
+            rerank_candidates=self.config.RERANK_CANDIDATES
+        )
     
     def _create_prompt_template(self) -> ChatPromptTemplate:
-        """Creates prompt template for answer generation"""
-        template = """You are a scientific paper assistant. Use the provided context to answer the question.
-
-Context:
-{context}
-
-Question: {question}
-
-Instructions:
-1. Answer in English
-2. Use only information from the provided context
-3. If there is no answer in the context, say so
-4. Structure the answer clearly and understandably
-5. Reference specific parts of the context when necessary
-
-Answer:"""
-        
-        return ChatPromptTemplate.from_template(template)
+        """Returns prompt template for answer generation (parsed once at import)"""
+        return ANSWER_PROMPT
     
-    def initialize_system(self, download_data: bool = False) -> None:
+    def initialize_system(self, download_data: bool = False, force_rebuild: bool = False) -> None:
         """
         Initializes RAG system
         """
+        run_async(self.ainitialize_system(download_data, force_rebuild))
+    
+    async def ainitialize_system(self, download_data: bool = False, force_rebuild: bool = False) -> None:
+        """
+        Initializes RAG system; up to EMBED_CONCURRENCY batches are embedded at once.
+        An already populated collection is kept unless download_data or force_rebuild is set.
+        """
         logger.info("Initializing RAG system...")
+        loop = asyncio.get_running_loop()
+        
+        if force_rebuild:
+            await loop.run_in_executor(None, self.reset_system)
+        elif not download_data:
+            count = await loop.run_in_executor(None, self.vector_store.count)
+            if count >= max(self.config.MIN_DOCS, 1):
+                logger.info(f"Collection already holds {count} chunks, skipping ingestion")
+                return
         
         # Load data
         if download_data:
-            self.data_loader.download_dataset()
+            await loop.run_in_executor(None, self.data_loader.download_dataset)
         
         # Load document corpus
-        papers = self.data_loader.load_corpus()
+        papers = await loop.run_in_executor(None, lambda: self.data_loader.load_corpus(fields=PAPER_FIELDS))
         
         if not papers:
             logger.warning("Document corpus is empty")
             return
         
-        # Process documents
-        documents = self.document_processor.process_corpus(papers)
+        # Chunks stream from a producer thread (iter_corpus fans out to its own process pool) in
+        # token-bounded batches; the bounded queue and semaphore keep only a few batches in memory
+        queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        semaphore = asyncio.Semaphore(self.config.EMBED_CONCURRENCY)
+        aliases: Dict[str, Tuple[str, List[str]]] = {}
+        
+        def _produce() -> None:
+            try:
+                rows = self.document_processor.iter_corpus_rows(papers, self.config.LOAD_WORKERS)
+                for batch in self._iter_batches(self._dedupe(rows, aliases)):
+                    asyncio.run_coroutine_threadsafe(queue.put(batch), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+        
+        async def _add_batch(batch_idx: int, batch: ChunkBatch) -> None:
+            try:
+                await self.vector_store.aadd_batch(batch, batch_size=self.config.ADD_BATCH_SIZE)
+                logger.info(f"Indexed batch {batch_idx} ({len(batch)} chunks)")
+            finally:
+                semaphore.release()
+        
+        producer = loop.run_in_executor(None, _produce)
+        tasks = []
+        while (batch := await queue.get()) is not None:
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(_add_batch(len(tasks) + 1, batch)))
+        await producer
+        
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.error(f"{len(errors)} of {len(tasks)} batches failed to index")
+            raise errors[0]
         
-        if not documents:
+        # Kept chunks list the other papers their duplicates came from (merged with aliases already stored)
+        await loop.run_in_executor(
+            None, self.vector_store.add_paper_aliases, {chunk_id: dups for chunk_id, (_, dups) in aliases.items()}
+        )
+        
+        await loop.run_in_executor(None, self._save_paper_meta)
+        await loop.run_in_executor(None, self.vector_store.finalize_load)
+        self._search_cache.clear()
+        self._answer_cache.clear()
+        
+        # Counted by the processor while chunking
+        stats = self.document_processor.get_document_stats()
+        if not stats["total_chunks"]:
             logger.warning("Failed to create documents")
             return
         
-        # Add documents to vector storage
-        self.vector_store.add_documents(documents)
-        
         # Output statistics
-        stats = self.document_processor.get_document_stats(documents)
         collection_info = self.vector_store.get_collection_info()
         
         logger.info(f"RAG system initialized:")
         logger.info(f"- Processed papers: {stats['papers_count']}")
         logger.info(f"- Created chunks: {stats['total_chunks']}")
+        logger.info(f"- Duplicate chunks skipped: {sum(len(dups) for _, dups in aliases.values())}")
         logger.info(f"- Content types: {stats['content_types']}")
         logger.info(f"- Documents in vector DB: {collection_info.get('document_count', 0)}")
     
+    def _load_paper_meta(self) -> None:
+        if os.path.exists(self.paper_meta_path):
+            with open(self.paper_meta_path, "rb") as f:
+                self.document_processor.paper_meta_table.update(orjson.loads(f.read()))
+    
+    def _save_paper_meta(self) -> None:
+        os.makedirs(os.path.dirname(self.paper_meta_path), exist_ok=True)
+        with open(self.paper_meta_path, "wb") as f:
+            f.write(orjson.dumps(self.document_processor.paper_meta_table))
+    
+    def resolve_metadata(self, chunk_metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Chunk metadata joined with its paper's title, authors, categories etc."""
+        paper_metadata = self.document_processor.paper_meta_table.get(chunk_metadata.get("paper_id"), {})
+        return {**paper_metadata, **chunk_metadata}
+    
+    def _resolve_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        for result in results:
+            result['metadata'] = self.resolve_metadata(result['metadata'] or {})
+        return results
+    
+    @staticmethod
+    def _dedupe(rows: Iterable[Tuple[str, Dict]], aliases: Dict[str, Tuple[str, List[str]]]) -> Iterator[Tuple[str, Dict]]:
+        """
+        Drops chunks whose exact content was already yielded, so boilerplate is embedded once.
+        aliases[kept chunk_id] = (its paper_id, paper_ids of the dropped duplicates).
+        """
+        # Text and table chunk ids are content hashes, equal ids mean equal content
+        first_paper: Dict[str, str] = {}
+        for content, metadata in rows:
+            # Image chunks share placeholder text, their identity is the stored file
+            if metadata.get("content_type") == "image":
+                yield content, metadata
+                continue
+            chunk_id = metadata["chunk_id"]
+            paper_id = first_paper.get(chunk_id)
+            if paper_id is None:
+                first_paper[chunk_id] = metadata.get("paper_id", "")
+                yield content, metadata
+            else:
+                aliases.setdefault(chunk_id, (paper_id, []))[1].append(metadata.get("paper_id", ""))
+    
+    def _iter_batches(self, rows: Iterable[Tuple[str, Dict]]) -> Iterator[ChunkBatch]:
+        """Packs rows into column batches of <= ADD_BATCH_SIZE chunks and <= MAX_TOKENS_PER_BATCH tokens"""
+        batch, batch_tokens = ChunkBatch(), 0
+        for content, metadata in rows:
+            # Counted once by the processor (in its worker process) when the chunk was made
+            tokens = metadata.get("token_count")
+            if tokens is None:
+                tokens = self.document_processor.count_tokens(content)
+            if batch and (len(batch) >= self.config.ADD_BATCH_SIZE or batch_tokens + tokens > self.config.MAX_TOKENS_PER_BATCH):
+                yield batch
+                batch, batch_tokens = ChunkBatch(), 0
+            batch.append(content, metadata)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+    
     def search_documents(self, 
                         query: str, 
                         n_results: int = None,
@@ -114,61 +275,161 @@ Answer:"""
         Performs search for relevant documents
         """
         n_results = n_results or self.config.TOP_K_RESULTS
+        scope = (n_results, content_type)
+        
+        # Exact repeat
+        key = (query, *scope)
+        hit = self._search_cache.get(key)
+        if hit is not None:
+            # Copies, so a caller reordering or trimming its results leaves the cached list intact
+            return list(hit[2])
         
         # Prepare filters
         where_filter = None
         if content_type:
             where_filter = {"content_type": content_type}
         
-        # Perform search
-        results = self.vector_store.search(
-            query=query,
-            n_results=n_results,
-            where=where_filter
-        )
+        # The vector store raises on errors; they are handled here, once per query
+        try:
+            # Near-duplicate of a cached query (embeddings are unit length, dot = cosine)
+            query_embedding = self.vector_store.embed_query(query)
+            for cached_embedding, cached_scope, cached_results in reversed(self._search_cache.values()):
+                if cached_scope == scope and float(np.dot(cached_embedding, query_embedding)) >= self.config.SEARCH_CACHE_SIMILARITY:
+                    logger.info(f"Semantic cache hit for query: '{query}'")
+                    # Stored under this query too, so its repeats are exact hits without an embedding
+                    self._search_cache.put(key, (query_embedding, scope, cached_results))
+                    return list(cached_results)
+            
+            # Perform search
+            results = self.vector_store.search(
+                query=query,
+                n_results=n_results,
+                where=where_filter,
+                query_embedding=query_embedding.tolist()
+            )
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            return []
         
         logger.info(f"Found {len(results)} relevant documents for query: '{query}'")
-        return results
+        results = self._resolve_results(results)
+        self._search_cache.put(key, (query_embedding, scope, results))
+        return list(results)
     
-    def generate_answer(self, 
-                       query: str, 
-                       context_documents: List[Dict[str, Any]] = None,
-                       n_results: int = None) -> Dict[str, Any]:
+    def search_documents_batch(self, 
+                               queries: List[str], 
+                               n_results: int = None,
+                               content_types: Optional[List[Optional[str]]] = None) -> List[List[Dict[str, Any]]]:
         """
-        Generates answer based on query and context
+        Searches several queries at once (single embedding call);
+        content_types[i] optionally filters queries[i]
         """
+        n_results = n_results or self.config.TOP_K_RESULTS
+        content_types = content_types or [None] * len(queries)
+        wheres = [{"content_type": ct} if ct else None for ct in content_types]
+        
+        try:
+            results = self.vector_store.search_batch(queries, n_results=n_results, wheres=wheres)
+        except Exception as e:
+            logger.error(f"Batch search error: {e}")
+            return [[] for _ in queries]
+        
+        logger.info(f"Batch search: {len(queries)} queries, {sum(len(r) for r in results)} documents")
+        return [self._resolve_results(r) for r in results]
+    
+    def _build_chain(self):
+        """Creates chain for answer generation, from a {"context", "question"} dict"""
+        return self.prompt_template | self.llm | StrOutputParser()
+    
+    def _check_llm(self) -> Optional[Dict[str, Any]]:
+        """Returns error result if language model is not configured"""
         if not self.llm:
             return {
                 "answer": "Language model not configured. Please set up OpenAI API key.",
                 "context": [],
                 "error": "LLM not configured"
             }
-        
-        # Get context documents
-        if context_documents is None:
-            context_documents = self.search_documents(query, n_results)
-        
+        return None
+    
+    def _check_documents(self, context_documents: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Returns error result if no context documents were found"""
         if not context_documents:
             return {
                 "answer": "No relevant documents found to answer your question.",
                 "context": [],
                 "error": "No relevant documents found"
             }
+        return None
+    
+    def generate_answer(self, 
+                       query: str, 
+                       context_documents: List[Dict[str, Any]] = None,
+                       n_results: int = None,
+                       content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Generates answer based on query and context
+        """
+        error = self._check_llm()
+        if error:
+            return error
+        
+        # Get context documents
+        if context_documents is None:
+            context_documents = self.search_documents(query, n_results, content_type)
+        
+        error = self._check_documents(context_documents)
+        if error:
+            return error
         
         # Format context
         context = self._format_context(context_documents)
         
         try:
-            # Create chain for answer generation
-            chain = (
-                {"context": RunnablePassthrough(), "question": RunnablePassthrough()}
-                | self.prompt_template
-                | self.llm
-                | StrOutputParser()
-            )
-            
             # Generate answer
-            answer = chain.invoke({"context": context, "question": query})
+            answer = self.chain.invoke({"context": context, "question": query})
+            
+            return {
+                "answer": answer,
+                "context": context_documents,
+                "query": query,
+                "context_length": len(context)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error generating answer: {e}")
+            return {
+                "answer": f"An error occurred while generating answer: {str(e)}",
+                "context": context_documents,
+                "error": str(e)
+            }
+    
+    async def agenerate_answer(self, 
+                              query: str, 
+                              context_documents: List[Dict[str, Any]] = None,
+                              n_results: int = None,
+                              content_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Async version of generate_answer: the LLM call uses the shared async HTTP client
+        """
+        error = self._check_llm()
+        if error:
+            return error
+        
+        # Vector search is synchronous, keep it off the event loop
+        if context_documents is None:
+            loop = asyncio.get_running_loop()
+            context_documents = await loop.run_in_executor(
+                None, self.search_documents, query, n_results, content_type
+            )
+        
+        error = self._check_documents(context_documents)
+        if error:
+            return error
+        
+        context = self._format_context(context_documents)
+        
+        try:
+            answer = await self.chain.ainvoke({"context": context, "question": query})
             
             return {
                 "answer": answer,
@@ -185,30 +446,77 @@ Answer:"""
                 "error": str(e)
             }
     
+    def stream_answer(self, 
+                      query: str, 
+                      context_documents: List[Dict[str, Any]] = None,
+                      n_results: int = None,
+                      content_type: Optional[str] = None) -> Iterator[str]:
+        """
+        Like generate_answer, but yields the answer text as the LLM produces it
+        (errors are yielded as the answer message)
+        """
+        error = self._check_llm()
+        if error:
+            yield error["answer"]
+            return
+        
+        if context_documents is None:
+            context_documents = self.search_documents(query, n_results, content_type)
+        
+        error = self._check_documents(context_documents)
+        if error:
+            yield error["answer"]
+            return
+        
+        try:
+            yield from self.chain.stream({"context": self._format_context(context_documents), "question": query})
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield f"An error occurred while generating answer: {str(e)}"
+    
     def _format_context(self, documents: List[Dict[str, Any]]) -> str:
         """
-        Formats context documents for prompt
+        Formats context documents for prompt: one compact header per document, each document cut to
+        MAX_DOC_TOKENS and the whole context to MAX_CONTEXT_TOKENS (later documents are dropped)
         """
+        encoding = self.document_processor.encoding
+        budget = self.config.MAX_CONTEXT_TOKENS
         context_parts = []
-        
         for i, doc in enumerate(documents, 1):
-            content = doc['content']
+            if budget <= 0:
+                break
             metadata = doc['metadata']
-            
-            # Add document metadata
-            paper_title = metadata.get('title', 'Unknown paper')
-            section_id = metadata.get('section_id', 'N/A')
-            content_type = metadata.get('content_type', 'text')
-            
-            context_part = f"[Document {i}]\n"
-            context_part += f"Paper: {paper_title}\n"
-            context_part += f"Section: {section_id}\n"
-            context_part += f"Content type: {content_type}\n"
-            context_part += f"Content:\n{content}\n"
-            
-            context_parts.append(context_part)
+            content = doc['content']
+            limit = min(self.config.MAX_DOC_TOKENS, budget)
+            # Chunks carry their token count from ingestion; encode only when it is missing or over the limit
+            n_tokens = metadata.get('token_count')
+            if n_tokens is None or n_tokens > limit:
+                tokens = encoding.encode_ordinary(content)
+                n_tokens = min(len(tokens), limit)
+                if len(tokens) > limit:
+                    content = encoding.decode(tokens[:limit])
+            budget -= n_tokens
+            context_parts.append(
+                f"[{i}] {metadata.get('title', 'Unknown paper')} | section {metadata.get('section_id', 'N/A')} | "
+                f"{metadata.get('content_type', 'text')}\n{content}"
+            )
         
-        return "\n" + "="*50 + "\n".join(context_parts)
+        return "\n\n".join(context_parts)
+    
+    def _system_info(self) -> Dict[str, Any]:
+        return {
+            "collection_name": self.config.COLLECTION_NAME,
+            "embedding_model": self.config.ST_EMBEDDING_MODEL,
+            "llm_model": self.config.LLM_MODEL
+        }
+    
+    @staticmethod
+    def _answer_cache_key(question: str, kwargs: Dict[str, Any]) -> Optional[str]:
+        """None when the answer depends on caller-supplied context documents"""
+        if kwargs.get("context_documents") is not None:
+            return None
+        return (hashlib.blake2b(question.encode(), digest_size=16).hexdigest()
+                + f"|{kwargs.get('n_results')}|{kwargs.get('content_type')}")
     
     def ask_question(self, question: str, **kwargs) -> Dict[str, Any]:
         """
@@ -216,18 +524,52 @@ Answer:"""
         """
         logger.info(f"Processing question: '{question}'")
         
+        key = self._answer_cache_key(question, kwargs)
+        if key is not None and (cached := self._answer_cache.get(key)) is not None:
+            # Deep copies, so callers editing sources or system_info leave the cached answer intact
+            return copy.deepcopy(cached)
+        
         # Generate answer
         result = self.generate_answer(question, **kwargs)
         
         # Add additional information
-        result["system_info"] = {
-            "collection_name": self.config.COLLECTION_NAME,
-            "embedding_model": self.config.EMBEDDING_MODEL,
-            "llm_model": self.config.LLM_MODEL
-        }
+        result["system_info"] = self._system_info()
         
+        if key is not None and not result.get("error"):
+            self._answer_cache.put(key, copy.deepcopy(result))
         return result
     
+    async def aask_question(self, question: str, **kwargs) -> Dict[str, Any]:
+        """
+        Async version of ask_question
+        """
+        logger.info(f"Processing question: '{question}'")
+        
+        key = self._answer_cache_key(question, kwargs)
+        if key is not None and (cached := self._answer_cache.get(key)) is not None:
+            # Deep copies, so callers editing sources or system_info leave the cached answer intact
+            return copy.deepcopy(cached)
+        
+        result = await self.agenerate_answer(question, **kwargs)
+        result["system_info"] = self._system_info()
+        
+        if key is not None and not result.get("error"):
+            self._answer_cache.put(key, copy.deepcopy(result))
+        return result
+    
+    async def agenerate_answers(self, queries: List[str], max_concurrency: int = 4, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Answers several queries concurrently (at most max_concurrency LLM calls in flight),
+        so one query's network wait overlaps another's search; results keep query order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _answer(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.agenerate_answer(query, **kwargs)
+        
+        return await asyncio.gather(*(_answer(query) for query in queries))
+    
     def get_system_stats(self) -> Dict[str, Any]:
         """
         Returns system statistics
@@ -240,7 +582,7 @@ Answer:"""
                 "chunk_size": self.config.CHUNK_SIZE,
                 "chunk_overlap": self.config.CHUNK_OVERLAP,
                 "top_k_results": self.config.TOP_K_RESULTS,
-                "embedding_model": self.config.EMBEDDING_MODEL,
+                "embedding_model": self.config.ST_EMBEDDING_MODEL,
                 "llm_model": self.config.LLM_MODEL
             },
             "llm_configured": self.llm is not None
@@ -252,4 +594,9 @@ Answer:"""
         """
         logger.info("Resetting RAG system...")
         self.vector_store.reset_collection()
+        self._search_cache.clear()
+        self._answer_cache.clear()
+        self.document_processor.paper_meta_table.clear()
+        if os.path.exists(self.paper_meta_path):
+            os.remove(self.paper_meta_path)
         logger.info("RAG system reset")
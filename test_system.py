@@ -6,7 +6,8 @@ import logging
 from dotenv import load_dotenv
 
 from rag_system import RAGSystem
-from config import Config
+from core.config import Config
+from core.http_clients import run_async
 
 # Load environment variables
 load_dotenv()
@@ -37,11 +38,10 @@ def test_rag_system():
     ]
     
     print("\n🔍 Testing document search...")
-    for question in test_questions:
+    # All questions are embedded in one pass
+    all_search_results = rag_system.search_documents_batch(test_questions, n_results=3)
+    for question, search_results in zip(test_questions, all_search_results):
         print(f"\nQuestion: {question}")
-        
-        # Test search
-        search_results = rag_system.search_documents(question, n_results=3)
         print(f"Found documents: {len(search_results)}")
         
         if search_results:
@@ -54,9 +54,11 @@ def test_rag_system():
     # Test answer generation (if LLM is configured)
     if rag_system.llm:
         print("\n💬 Testing answer generation...")
-        for question in test_questions[:2]:  # Test only first 2 questions
+        questions = test_questions[:2]  # Test only first 2 questions
+        # Answered concurrently on the shared event loop (its async HTTP client is bound to it)
+        results = run_async(rag_system.agenerate_answers(questions, n_results=2))
+        for question, result in zip(questions, results):
             print(f"\nQuestion: {question}")
-            result = rag_system.generate_answer(question, n_results=2)
             
             if result.get('error'):
                 print(f"Error: {result['error']}")
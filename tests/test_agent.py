@@ -1,5 +1,10 @@
 import pytest
-from core.rag_agent import RAGAgent
+from core.rag_agent import RAGAgent, needs_web_search
+from core.http_clients import run_async
+from core.config import Config
+from core.query_cache import QueryCache
+from core.reranker import BatchedCrossEncoderRerank
+from llama_index.core.schema import NodeWithScore, TextNode
 
 @pytest.fixture(scope="module")
 def agent():
@@ -18,3 +23,36 @@ def test_answer(agent):
         assert result.strip()
     except Exception as e:
         pytest.skip(f"Answer skipped: {e}")
+
+def test_aanswer(agent):
+    try:
+        result = run_async(agent.aanswer("What is machine learning?"))
+        assert isinstance(result, str)
+        assert result.strip()
+    except Exception as e:
+        pytest.skip(f"Async answer skipped: {e}")
+
+def test_ask_direct(agent):
+    try:
+        result = agent.ask_direct("What is machine learning?")
+        assert isinstance(result, str)
+        assert result.strip()
+    except Exception as e:
+        pytest.skip(f"Direct answer skipped: {e}")
+
+def test_needs_web_search():
+    assert needs_web_search("What is the latest GPT release?")
+    assert needs_web_search("Please SEARCH THE WEB for RAG papers")
+    assert not needs_web_search("What is machine learning?")
+
+def test_postprocess_applies_reranker():
+    class StubReranker(BatchedCrossEncoderRerank):
+        def _postprocess_nodes(self, nodes, query_bundle=None):
+            assert query_bundle.query_str == "q"
+            return sorted(nodes, key=lambda n: n.node.get_content())[:self.top_n]
+    stub = RAGAgent.__new__(RAGAgent)
+    stub.config = Config()
+    stub.reranker = StubReranker(top_n=2)
+    stub._cache = QueryCache(max_size=4, ttl=60)
+    nodes = [NodeWithScore(node=TextNode(text=text)) for text in ("c", "a", "b")]
+    assert stub._postprocess("q", nodes, "key") == "a\nb"
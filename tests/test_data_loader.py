@@ -0,0 +1,53 @@
+import os
+import stat
+import orjson
+from data_loader import CACHE_DIR, CACHE_FLAG_FILE, OpenRAGDataLoader
+
+def write_paper(loader, paper_id, title):
+    (loader.corpus_dir / f"{paper_id}.json").write_bytes(orjson.dumps({"id": paper_id, "title": title}))
+
+def titles(loader):
+    return {paper["id"]: paper["title"] for paper in loader.load_corpus_stream()}
+
+def test_sample_data_keeps_existing_papers(tmp_path):
+    loader = OpenRAGDataLoader(str(tmp_path))
+    write_paper(loader, "real_001", "Real paper")
+    assert titles(loader) == {"real_001": "Real paper"}
+    loader.download_dataset()
+    assert set(titles(loader)) == {"real_001", "sample_001", "sample_002"}
+
+def test_paper_edited_in_place_is_reconsolidated(tmp_path):
+    loader = OpenRAGDataLoader(str(tmp_path))
+    write_paper(loader, "real_001", "Old title")
+    assert titles(loader) == {"real_001": "Old title"}
+    paper_file = loader.corpus_dir / "real_001.json"
+    dir_mtime = loader.corpus_dir.stat().st_mtime_ns
+    write_paper(loader, "real_001", "New title")
+    # Make the edit strictly newer than the ndjson even on coarse-mtime filesystems
+    newer = loader.corpus_file.stat().st_mtime_ns + 1_000_000_000
+    os.utime(paper_file, ns=(newer, newer))
+    assert loader.corpus_dir.stat().st_mtime_ns == dir_mtime
+    assert titles(loader) == {"real_001": "New title"}
+
+def test_corpus_cache_is_private_to_data_dir(tmp_path):
+    loader = OpenRAGDataLoader(str(tmp_path))
+    (tmp_path / CACHE_FLAG_FILE).touch()
+    write_paper(loader, "real_001", "Cached paper")
+    loader._ensure_corpus_file()
+    assert [paper["id"] for paper in loader._read_corpus()] == ["real_001"]
+    cache_dir = tmp_path / CACHE_DIR
+    assert [path.suffix for path in cache_dir.iterdir()] == [".pkl"]
+    assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+    # Served from the cache
+    assert [paper["title"] for paper in loader._read_corpus()] == ["Cached paper"]
+
+def test_add_paper_lines_appends_and_replaces_by_id(tmp_path):
+    loader = OpenRAGDataLoader(str(tmp_path))
+    stored = b'{"title":"Key order kept","id":"a"}\n{"id":"b","title":"Old b"}\n'
+    loader.corpus_file.write_bytes(stored)
+    loader.add_paper_lines([b'{"id":"c","title":"New c"}', b'{"id":"q\\"d","title":"Escaped id"}'])
+    # New ids only: stored lines are left byte for byte
+    assert loader.corpus_file.read_bytes().startswith(stored)
+    loader.add_paper_lines([b'{"id":"b","title":"New b"}'])
+    assert titles(loader) == {"a": "Key order kept", "b": "New b", "c": "New c", 'q"d': "Escaped id"}
+    assert loader.corpus_file.read_bytes().startswith(b'{"title":"Key order kept","id":"a"}\n')
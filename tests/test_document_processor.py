@@ -0,0 +1,31 @@
+import pytest
+from document_processor import DocumentProcessor, _get_encoding
+
+try:
+    _get_encoding()
+except Exception:  # the BPE file is downloaded on first use
+    pytest.skip("cl100k_base encoding is not available", allow_module_level=True)
+
+@pytest.fixture
+def processor(tmp_path):
+    return DocumentProcessor(chunk_size=50, chunk_overlap=10, image_store_dir=str(tmp_path))
+
+def test_windows_fit_chunk_size(processor):
+    text = " ".join(f"w{i}" for i in range(200))
+    chunks, counts = processor._split_text(text)
+    assert len(chunks) > 1
+    assert all(count <= 50 for count in counts)
+    # Stripping the window edges never adds tokens
+    assert all(len(processor.encoding.encode_ordinary(chunk)) <= count for chunk, count in zip(chunks, counts))
+
+def test_neighbours_share_overlap(processor):
+    chunks, _ = processor._split_text(" ".join(f"w{i}" for i in range(200)))
+    # The last words of a chunk open the next one (its first word may start mid-token)
+    for prev, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split()[1] in prev.split()[-10:]
+
+def test_small_tail_extends_previous_window(processor):
+    # The tail overlaps its predecessor by 5 tokens: the joined window is 33 tokens, not 30 + 8
+    assert processor._merge_small([(0, 30), (25, 33)]) == [(0, 33)]
+    # Joining past chunk_size keeps the tail separate
+    assert processor._merge_small([(0, 45), (44, 53)]) == [(0, 45), (44, 53)]
@@ -0,0 +1,13 @@
+import numpy as np
+from core.embedding_cache import EmbeddingCache
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), dim=3)
+    h1, h2 = EmbeddingCache.content_hash("a"), EmbeddingCache.content_hash("b")
+    cache.put_many([h1], [[1.0, 2.0, 3.0]])
+    cache.put_many([h2], [[4.0, 5.0, 6.0]])
+
+    reopened = EmbeddingCache(str(tmp_path), dim=3)
+    got = reopened.get_many([h1, h2, EmbeddingCache.content_hash("missing")])
+    assert set(got) == {h1, h2}
+    np.testing.assert_array_equal(got[h2], [4.0, 5.0, 6.0])
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import faiss_ivfpq_store
+from faiss_ivfpq_store import FaissIVFPQStore
+from vector_store import ChunkBatch
+
+DIM = 16
+
+class FakeEmbedder:
+    def get_sentence_embedding_dimension(self):
+        return DIM
+
+@pytest.fixture
+def make_store(tmp_path, monkeypatch):
+    def init_embedder(self, *_):
+        self.embedding_model = FakeEmbedder()
+        self.embedding_cache = None
+        self.compiled_max_length = None
+    monkeypatch.setattr(FaissIVFPQStore, "_init_embedder", init_embedder)
+    return lambda **kwargs: FaissIVFPQStore(persist_directory=str(tmp_path), nlist=4, pq_m=4, nprobe=4, **kwargs)
+
+def vectors(n, seed=0):
+    v = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+def add(store, start, stop, seed=0):
+    batch = ChunkBatch()
+    for i in range(start, stop):
+        batch.append(f"text {i}", {"chunk_id": f"c{i}", "paper_id": f"p{i % 10}", "content_type": "table" if i % 3 == 0 else "text"})
+    store._write(batch, vectors(stop, seed)[start:], None)
+
+def test_flat_index_trains_ivfpq_at_train_size(make_store):
+    store = make_store(train_size=300)
+    add(store, 0, 299)
+    assert store._is_flat()
+    add(store, 299, 400)
+    assert not store._is_flat() and store.count() == 400
+    hits = store._search_vectors(vectors(400)[:1], 5, None)[0]
+    assert "c0" in [hit["id"] for hit in hits]
+
+def test_finalize_load_trains_and_reload_stays_in_sync(make_store, monkeypatch):
+    monkeypatch.setattr(faiss_ivfpq_store, "MIN_IVFPQ_VECTORS", 300)
+    store = make_store()
+    add(store, 0, 400)
+    store.finalize_load()
+    reopened = make_store()
+    assert not reopened._is_flat() and reopened.count() == 400 and reopened.index.nprobe == 4
+    # Rows added after the last index write are dropped on reload, the persisted ones survive
+    add(reopened, 400, 410)
+    resynced = make_store()
+    assert resynced.count() == 400 and resynced._row_count() == 400
+    assert len(resynced.get_documents_by_paper_id("p3")) == 40
+    add(resynced, 400, 410)
+    assert resynced.count() == 410
+
+def test_interrupted_load_keeps_checkpointed_chunks(make_store, monkeypatch):
+    monkeypatch.setattr(faiss_ivfpq_store, "CHECKPOINT_VECTORS", 50)
+    store = make_store()
+    for start in range(0, 120, 20):
+        add(store, start, start + 20)
+    # Checkpoints after 60 and 120 vectors; the last 20 rows were never indexed on disk
+    add(store, 120, 140)
+    reopened = make_store()
+    assert reopened.count() == reopened._row_count() == 120
+    hits = reopened._search_vectors(vectors(140)[100:101], 1, None)[0]
+    assert hits[0]["id"] == "c100"
+
+def test_filtered_search_matches_only_selected_ids(make_store):
+    store = make_store()
+    add(store, 0, 60)
+    query = vectors(60)[:1]
+    hits = store._search_vectors(query, 10, {"content_type": "table"})[0]
+    assert hits and all(hit["metadata"]["content_type"] == "table" for hit in hits)
+    assert hits[0]["id"] == "c0"
+    assert {hit["id"] for hit in store._search_vectors(query, 10, {"paper_id": {"$eq": "p3"}})[0]} == \
+        {f"c{i}" for i in range(3, 60, 10)}
+    # Aliased chunks match their alias papers too, a paper without chunks matches nothing
+    store.add_paper_aliases({"c0": ["p3"]})
+    assert "c0" in {hit["id"] for hit in store._search_vectors(query, 10, {"paper_id": "p3"})[0]}
+    assert store._search_vectors(query, 10, {"paper_id": "missing"}) == [[]]
+
+def test_no_chroma_helpers_are_inherited(make_store):
+    store = make_store()
+    assert store.configure_hnsw_params() == {"nprobe": 4}
+    for name in ("collection", "client", "payload_index", "int8_index", "add_quantized", "_payload_covers_collection"):
+        assert not hasattr(store, name)
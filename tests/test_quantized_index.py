@@ -0,0 +1,25 @@
+import numpy as np
+from quantized_index import Int8VectorIndex, quantize
+
+def test_quantize_roundtrip_is_close():
+    v = np.random.default_rng(0).normal(size=(4, 16)).astype(np.float32)
+    codes, scales = quantize(v)
+    assert codes.dtype == np.int8 and scales.shape == (4,)
+    unit = v / np.linalg.norm(v, axis=1, keepdims=True)
+    np.testing.assert_allclose(codes * scales[:, None], unit, atol=0.01)
+
+def test_search_ranks_and_filters(tmp_path):
+    index = Int8VectorIndex(str(tmp_path), dim=3)
+    vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.9, 0.1, 0.0]]
+    index.add(["a", "b", "c"], *quantize(vectors), ["text", "text", "table"])
+
+    hits = index.search([[1.0, 0.0, 0.0]], k=2)[0]
+    assert [chunk_id for chunk_id, _ in hits] == ["a", "c"]
+    assert abs(hits[0][1] - 1.0) < 0.01
+    assert [chunk_id for chunk_id, _ in index.search([[1.0, 0.0, 0.0]], k=2, content_type="text")[0]] == ["a", "b"]
+
+    # Re-added ids replace their old row
+    index.add(["a"], *quantize([[0.0, 0.0, 1.0]]), ["text"])
+    reopened = Int8VectorIndex(str(tmp_path), dim=3)
+    assert len(reopened) == 3
+    assert reopened.search([[0.0, 0.0, 1.0]], k=1)[0][0][0] == "a"
@@ -0,0 +1,29 @@
+import time
+from core.query_cache import QueryCache
+
+def test_get_put_and_lru_eviction():
+    cache = QueryCache(max_size=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1 # "a" becomes most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert cache.hits == 2 and cache.misses == 1
+
+def test_ttl_expiry_and_clear():
+    cache = QueryCache(max_size=4, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+
+def test_values_skips_expired():
+    cache = QueryCache(max_size=4, ttl=0.01)
+    cache.put("a", 1)
+    time.sleep(0.02)
+    cache.put("b", 2)
+    assert cache.values() == [2]
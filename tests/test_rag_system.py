@@ -0,0 +1,62 @@
+import asyncio
+import numpy as np
+from core.config import Config
+from core.query_cache import QueryCache
+from document_processor import DocumentProcessor
+from rag_system import RAGSystem
+
+class FakeVectorStore:
+    """Embeds 'cat'-like queries onto the same unit vector and counts searches"""
+    def __init__(self):
+        self.searches = 0
+
+    def embed_query(self, query):
+        return np.array([1.0, 0.0]) if "cat" in query else np.array([0.0, 1.0])
+
+    def search(self, query, n_results, where=None, query_embedding=None):
+        self.searches += 1
+        return [{"id": f"{query}-{i}", "metadata": {"paper_id": "p1"}} for i in range(n_results)]
+
+def make_rag():
+    # Attributes search_documents reads, without loading models or the corpus
+    rag = RAGSystem.__new__(RAGSystem)
+    rag.config = Config()
+    rag._search_cache = QueryCache(max_size=8, ttl=60)
+    rag.vector_store = FakeVectorStore()
+    rag.document_processor = DocumentProcessor.__new__(DocumentProcessor)
+    rag.document_processor.paper_meta_table = {}
+    return rag
+
+def test_semantic_hit_returns_copy_and_caches_exact_key():
+    rag = make_rag()
+    first = rag.search_documents("cat", n_results=2)
+    hit = rag.search_documents("a cat", n_results=2)
+    assert hit == first and rag.vector_store.searches == 1
+    # Trimming a returned list does not touch the cache
+    hit.pop()
+    first.clear()
+    rag.vector_store.embed_query = None # an exact hit needs no embedding
+    assert [r["id"] for r in rag.search_documents("a cat", n_results=2)] == ["cat-0", "cat-1"]
+    assert [r["id"] for r in rag.search_documents("cat", n_results=2)] == ["cat-0", "cat-1"]
+
+def test_answer_cache_hits_return_copies():
+    rag = make_rag()
+    rag._answer_cache = QueryCache(max_size=8, ttl=60)
+    calls = []
+    def generate_answer(question, **_):
+        calls.append(question)
+        return {"answer": "42", "sources": [{"id": "c1", "metadata": {"paper_id": "p1"}}]}
+    async def agenerate_answer(question, **kwargs):
+        return generate_answer(question, **kwargs)
+    rag.generate_answer, rag.agenerate_answer = generate_answer, agenerate_answer
+
+    first = rag.ask_question("q")
+    first["sources"][0]["metadata"]["paper_id"] = "edited"
+    first["system_info"]["llm_model"] = "edited"
+    hit = rag.ask_question("q")
+    assert hit["sources"] == [{"id": "c1", "metadata": {"paper_id": "p1"}}]
+    assert hit["system_info"] == rag._system_info()
+    hit["sources"].clear()
+    ahit = asyncio.run(rag.aask_question("q"))
+    assert ahit["sources"] and ahit["system_info"] is not hit["system_info"]
+    assert calls == ["q"]
@@ -0,0 +1,30 @@
+import torch
+from llama_index.core.schema import NodeWithScore, QueryBundle, TextNode
+from core import reranker
+from core.reranker import BatchedCrossEncoderRerank
+
+class StubTokenizer:
+    def __call__(self, pairs, **_):
+        # One row per pair; the "relevance" is the passage length
+        return StubInputs(torch.tensor([[float(len(passage))] for _, passage in pairs]))
+
+class StubInputs(dict):
+    def __init__(self, lengths):
+        super().__init__(lengths=lengths)
+
+    def to(self, device):
+        return self
+
+class StubModel:
+    def __call__(self, lengths, return_dict=False):
+        return (lengths,)
+
+def test_nodes_reordered_and_cut_to_top_n(monkeypatch):
+    monkeypatch.setattr(reranker, "_load_cross_encoder", lambda model: (StubTokenizer(), StubModel(), "cpu"))
+    nodes = [NodeWithScore(node=TextNode(text=text), score=0.0) for text in ("bb", "a", "dddd", "ccc")]
+    rerank = BatchedCrossEncoderRerank(top_n=2)
+    kept = rerank.postprocess_nodes(nodes, query_bundle=QueryBundle(query_str="q"))
+    assert [n.node.get_content() for n in kept] == ["dddd", "ccc"]
+    assert [n.score for n in kept] == [4.0, 3.0]
+    # query_str builds the bundle too
+    assert [n.node.get_content() for n in rerank.postprocess_nodes(nodes, query_str="q")] == ["dddd", "ccc"]
@@ -0,0 +1,63 @@
+import hashlib
+import logging
+import chromadb
+import numpy as np
+import pytest
+from langchain.schema import Document
+from vector_store import VectorStore
+
+class FakeEmbedder:
+    """Deterministic unit vectors from a text hash, in place of the SentenceTransformer"""
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, texts, normalize_embeddings=False, **_):
+        vectors = np.stack([
+            np.frombuffer(hashlib.blake2b(t.encode(), digest_size=32).digest(), dtype=np.uint8)[:8].astype(np.float32) + 1
+            for t in texts
+        ])
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    def init_embedder(self, *_):
+        self.embedding_model = FakeEmbedder()
+        self.embedding_cache = None
+        self.compiled_max_length = None
+    monkeypatch.setattr(VectorStore, "_init_embedder", init_embedder)
+    return VectorStore(persist_directory=str(tmp_path), hnsw_params={"M": 16, "construction_ef": 100, "search_ef": 10})
+
+def test_finalize_load_retunes_search_ef(store):
+    store.add_documents([Document(page_content=f"text {i}", metadata={"paper_id": "p1"}) for i in range(3)])
+    store.finalize_load()
+    assert store.collection.metadata["hnsw:search_ef"] == 64
+    assert store.client.get_collection(store.collection_name).metadata["hnsw:search_ef"] == 64
+
+def test_identical_documents_are_added_once(store):
+    store.add_documents([Document(page_content="same text", metadata={"paper_id": "p1"}),
+                         Document(page_content="same text", metadata={"paper_id": "p1"})])
+    assert store.count() == 1
+    # Unchanged chunks of a later add are skipped
+    store.add_documents([Document(page_content="same text", metadata={"paper_id": "p1"}),
+                         Document(page_content="other text", metadata={"paper_id": "p1"})])
+    assert store.count() == 2
+
+def test_stored_duplicate_of_another_paper_becomes_alias(store):
+    store.add_documents([Document(page_content="shared text", metadata={"paper_id": "p1"})])
+    store.add_documents([Document(page_content="shared text", metadata={"paper_id": "p2"}),
+                         Document(page_content="shared text", metadata={"paper_id": "p3"})])
+    assert store.count() == 1
+    [doc] = store.get_documents_by_paper_id("p2")
+    assert doc["metadata"]["paper_id"] == "p1"
+    assert doc["metadata"]["alias_paper_ids"] == "p2, p3"
+    # Re-adding a known alias changes nothing
+    store.add_paper_aliases({doc["id"]: ["p1", "p2"]})
+    assert store.get_documents_by_paper_id("p1")[0]["metadata"]["alias_paper_ids"] == "p2, p3"
+
+def test_segment_update_skipped_on_other_chroma_versions(store, monkeypatch, caplog):
+    monkeypatch.setattr(chromadb, "__version__", "0.5.0")
+    store.add_documents([Document(page_content="text", metadata={"paper_id": "p1"})])
+    with caplog.at_level(logging.WARNING, logger="vector_store"):
+        store.finalize_load()
+    assert "HNSW segments not updated" in caplog.text
+    assert store.collection.metadata["hnsw:search_ef"] == 64
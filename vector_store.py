@@ -1,27 +1,294 @@
 """
 Module for working with vector storage
 """
+import asyncio
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Set, Tuple
 import chromadb
+import numpy as np
 from chromadb.config import Settings
+from chromadb.types import SegmentScope
 from sentence_transformers import SentenceTransformer
+import torch
 from langchain.schema import Document
 import logging
 
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
+from core.embedding_cache import EmbeddingCache
+from payload_index import PayloadIndex
+from quantized_index import Int8VectorIndex, quantize
+
 logger = logging.getLogger(__name__)
 
-class VectorStore:
+# Texts per forward pass of the embedding model
+ENCODE_BATCH_SIZE = 256
+# HNSW (M, construction_ef, search_ef) by collection size: larger graphs need more links and breadth for the same recall
+_HNSW_TIERS = ((100_000, 16, 100, 64), (1_000_000, 24, 128, 100), (None, 32, 200, 200))
+
+def hnsw_params_for(n: int) -> Dict[str, int]:
+    """Suggested Chroma HNSW parameters for a collection of n vectors"""
+    for limit, m, construction_ef, search_ef in _HNSW_TIERS:
+        if limit is None or n < limit:
+            return {"M": m, "construction_ef": construction_ef, "search_ef": search_ef}
+
+def _cosine_similarities(query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Exact cosine of query against every row (SimSIMD kernels when installed: pip install simsimd)"""
+    if simsimd is not None:
+        return 1.0 - np.asarray(simsimd.cdist(query[None, :], vectors, metric="cosine"), dtype=np.float32)[0]
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12
+    return (vectors @ query) / norms
+
+# Chroma version whose HNSW segments keep their own copy of the hnsw:* metadata (see _set_segment_search_ef)
+SEGMENT_METADATA_CHROMA = "0.4."
+
+# Metadata value types Chroma stores as is
+_PRIMITIVE_TYPES = frozenset((str, int, float, bool))
+
+@dataclass
+class ChunkBatch:
+    """Column-oriented batch of chunks, in the shape collection.add takes"""
+    ids: List[str] = field(default_factory=list)
+    texts: List[str] = field(default_factory=list)
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    
+    def append(self, text: str, metadata: Dict[str, Any]) -> None:
+        self.ids.append(metadata.get("chunk_id") or EmbeddingCache.content_hash(text))
+        self.texts.append(text)
+        
+        # Clean metadata for ChromaDB (remove complex types). Chunks from DocumentProcessor are
+        # all primitives, so the common case is one type lookup per value and no copy
+        if all(type(value) in _PRIMITIVE_TYPES for value in metadata.values()):
+            self.metadatas.append(metadata)
+        else:
+            self.metadatas.append({
+                key: value if isinstance(value, (str, int, float, bool)) else str(value)
+                for key, value in metadata.items()
+            })
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+
+class BaseVectorStore:
+    """
+    Embedding, de-duplication and add pipeline shared by the storage backends. Subclasses store the
+    chunks: count, stored_metadatas, _write, add_paper_aliases, search, search_batch, _get_where...
+    """
+    
+    def _init_embedder(self, embedding_model: str, embedding_cache_dir: Optional[str],
+                       onnx_model_path: Optional[str], compile_model: bool) -> None:
+        """Loads the embedding model and opens its embedding cache (shared by the storage backends)"""
+        # Load embedding model: an INT8 ONNX export on CPU when given, else the SentenceTransformer,
+        # on GPU in half precision (~2x less memory traffic per encode)
+        if onnx_model_path:
+            from onnx_embedder import OnnxEmbedder
+            self.embedding_model = OnnxEmbedder(onnx_model_path)
+        else:
+            device = "cuda" if torch.cuda.is_available() else None
+            self.embedding_model = SentenceTransformer(embedding_model, device=device)
+            if device == "cuda":
+                self.embedding_model.half()
+        # Fixed-shape padded length of the compiled model's inputs (None: SentenceTransformer.encode)
+        self.compiled_max_length: Optional[int] = None
+        if compile_model:
+            self._compile_embedding_model()
+        
+        # Chunk vectors by content hash, so rebuilds only embed new or changed chunks
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if embedding_cache_dir:
+            # Quantized vectors differ slightly from the fp32 model's, keep them apart
+            cache_name = embedding_model.replace("/", "__") + ("__onnx_int8" if onnx_model_path else "")
+            self.embedding_cache = EmbeddingCache(
+                os.path.join(embedding_cache_dir, cache_name),
+                dim=self.embedding_model.get_sentence_embedding_dimension()
+            )
+    
+    def add_documents(self, documents: List[Document], batch_size: Optional[int] = None) -> None:
+        """
+        Adds documents to vector storage, at most batch_size per collection.add call
+        """
+        if not documents:
+            logger.warning("No documents to add")
+            return
+        
+        batch, aliases = self._drop_stored(self._prepare_documents(documents))
+        if batch:
+            self._write(batch, self._embed(batch.texts), batch_size)
+        self.add_paper_aliases(aliases)
+    
+    async def aadd_documents(self, documents: List[Document], batch_size: Optional[int] = None) -> None:
+        """
+        Async add of Documents, see aadd_batch
+        """
+        if not documents:
+            logger.warning("No documents to add")
+            return
+        
+        await self.aadd_batch(self._prepare_documents(documents), batch_size)
+    
+    async def aadd_batch(self, batch: ChunkBatch, batch_size: Optional[int] = None) -> None:
+        """
+        Async add: texts are encoded with the local embedding model in a worker thread
+        (torch releases the GIL), so several batches can embed concurrently
+        """
+        if not batch:
+            logger.warning("No documents to add")
+            return
+        
+        loop = asyncio.get_running_loop()
+        batch, aliases = await loop.run_in_executor(None, self._drop_stored, batch)
+        if batch:
+            embeddings = await loop.run_in_executor(None, self._embed, batch.texts)
+            await loop.run_in_executor(None, self._write, batch, embeddings, batch_size)
+        await loop.run_in_executor(None, self.add_paper_aliases, aliases)
+    
+    def _compile_embedding_model(self) -> None:
+        """
+        torch.compile(mode='reduce-overhead') of the transformer, which replays CUDA graphs of fixed
+        input shapes instead of launching every kernel from Python. GPU SentenceTransformer only.
+        """
+        if not isinstance(self.embedding_model, SentenceTransformer) or self.embedding_model.device.type != "cuda":
+            logger.info("Embedding model is not a SentenceTransformer on GPU, not compiling it")
+            return
+        if not hasattr(torch, "compile"):
+            logger.warning("torch.compile needs PyTorch 2.0+, not compiling the embedding model")
+            return
+        module = self.embedding_model._first_module()
+        module.auto_model = torch.compile(module.auto_model, mode="reduce-overhead")
+        self.compiled_max_length = self.embedding_model.max_seq_length
+        # Graphs are recorded on the first calls of each shape: warm up the query and full batch sizes
+        for size in (1, ENCODE_BATCH_SIZE):
+            for _ in range(3):
+                self._encode_fixed_shape([""] * size)
+    
+    def _encode_fixed_shape(self, texts: List[str]) -> np.ndarray:
+        """
+        Encodes through the compiled model: inputs padded to compiled_max_length tokens and batches
+        to a power of two, so at most log2(ENCODE_BATCH_SIZE) + 1 shapes are ever captured
+        """
+        model = self.embedding_model
+        vectors = []
+        with torch.no_grad():
+            for start in range(0, len(texts), ENCODE_BATCH_SIZE):
+                chunk = texts[start:start + ENCODE_BATCH_SIZE]
+                padded = chunk + [""] * ((1 << (len(chunk) - 1).bit_length()) - len(chunk))
+                features = model.tokenizer(padded, padding="max_length", truncation=True,
+                                           max_length=self.compiled_max_length, return_tensors="pt")
+                features = {key: value.to(model.device) for key, value in features.items()}
+                # Copied out right away: the next graph replay reuses the output buffer
+                embeddings = model(features)["sentence_embedding"][:len(chunk)].float()
+                vectors.append(torch.nn.functional.normalize(embeddings, dim=1).cpu().numpy())
+        return np.concatenate(vectors)
+    
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encodes texts in batched calls to unit-length vectors (fp16 when the model runs on GPU)"""
+        if self.compiled_max_length is not None:
+            return self._encode_fixed_shape(texts)
+        return self.embedding_model.encode(
+            texts, batch_size=min(len(texts), ENCODE_BATCH_SIZE), convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )
+    
+    def embed_query(self, query: str) -> np.ndarray:
+        """Unit-length fp32 embedding of a query, as search() computes it"""
+        return self._encode([query])[0].astype(np.float32)
+    
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds chunk texts; with the cache, only texts not embedded by an earlier build"""
+        if self.embedding_cache is None:
+            return self._encode(texts).astype(np.float32)
+        
+        hashes = [EmbeddingCache.content_hash(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        missing = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        if missing:
+            vectors = self._encode(list(missing.values()))
+            self.embedding_cache.put_many(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+        logger.info(f"Embedded {len(missing)} of {len(texts)} chunks ({len(texts) - len(missing)} from cache)")
+        return np.stack([cached[h] for h in hashes]).astype(np.float32)
+    
+    def _drop_stored(self, batch: ChunkBatch) -> Tuple[ChunkBatch, Dict[str, List[str]]]:
+        """
+        Chunks of batch not stored yet, first occurrence of each id. Ids are content hashes, so unchanged
+        chunks are skipped before embedding, and equal texts in one batch would repeat an id in one add.
+        Also returns the paper_ids of the skipped chunks by id, for add_paper_aliases.
+        """
+        stored = set(self.stored_metadatas(batch.ids))
+        if not stored and len(set(batch.ids)) == len(batch):
+            return batch, {}
+        new = ChunkBatch()
+        aliases: Dict[str, List[str]] = {}
+        for chunk_id, text, metadata in zip(batch.ids, batch.texts, batch.metadatas):
+            if chunk_id in stored:
+                aliases.setdefault(chunk_id, []).append(metadata.get("paper_id", ""))
+                continue
+            stored.add(chunk_id)
+            new.ids.append(chunk_id)
+            new.texts.append(text)
+            new.metadatas.append(metadata)
+        logger.info(f"Skipping {len(batch) - len(new)} of {len(batch)} chunks already stored or repeated")
+        return new, aliases
+    
+    @staticmethod
+    def _merge_aliases(stored: Dict[str, Dict[str, Any]], aliases: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Full alias_paper_ids of the stored chunks that gain a paper other than their own"""
+        updates = {}
+        for chunk_id, paper_ids in aliases.items():
+            metadata = stored.get(chunk_id)
+            if metadata is None:
+                continue
+            known = set(filter(None, (metadata.get("alias_paper_ids") or "").split(", ")))
+            added = set(paper_ids) - known - {metadata.get("paper_id"), ""}
+            if added:
+                updates[chunk_id] = sorted(known | added)
+        return updates
+    
+    @staticmethod
+    def _prepare_documents(documents: List[Document]) -> ChunkBatch:
+        """Prepares ids, texts and metadatas for ChromaDB"""
+        batch = ChunkBatch()
+        for doc in documents:
+            batch.append(doc.page_content, doc.metadata)
+        return batch
+    
+    def get_documents_by_paper_id(self, paper_id: str) -> List[Dict[str, Any]]:
+        """
+        Gets all documents by paper ID
+        """
+        return self._get_where("paper_id", paper_id)
+    
+    def get_documents_by_content_type(self, content_type: str) -> List[Dict[str, Any]]:
+        """
+        Gets documents by content type
+        """
+        return self._get_where("content_type", content_type)
+
+class VectorStore(BaseVectorStore):
     """Class for working with ChromaDB vector storage"""
     
     def __init__(self, 
                  collection_name: str = "arxiv_papers",
                  persist_directory: str = "data/vector_db",
-                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 quantization: str = "none",
+                 embedding_cache_dir: Optional[str] = None,
+                 hnsw_params: Optional[Dict[str, int]] = None,
+                 rerank_candidates: int = 0,
+                 onnx_model_path: Optional[str] = None,
+                 compile_model: bool = False):
         
         self.collection_name = collection_name
         self.persist_directory = persist_directory
         self.embedding_model_name = embedding_model
+        # HNSW settings for a new collection ({"M", "construction_ef", "search_ef"}), Chroma defaults otherwise
+        self.hnsw_params = hnsw_params or {}
+        # HNSW hits fetched per query for exact re-ranking (<= n_results: no re-ranking)
+        self.rerank_candidates = rerank_candidates
         
         # Create storage directory
         os.makedirs(persist_directory, exist_ok=True)
@@ -35,8 +302,20 @@ class VectorStore:
             )
         )
         
-        # Load embedding model
-        self.embedding_model = SentenceTransformer(embedding_model)
+        self._init_embedder(embedding_model, embedding_cache_dir, onnx_model_path, compile_model)
+        # Concurrent async adds embed in parallel but write to the collection one at a time
+        self._write_lock = threading.Lock()
+        
+        # 'int8': keep int8 codes of every embedding next to the collection and search those
+        self.int8_index: Optional[Int8VectorIndex] = None
+        if quantization == "int8":
+            self.int8_index = Int8VectorIndex(
+                os.path.join(persist_directory, f"{collection_name}_int8"),
+                dim=self.embedding_model.get_sentence_embedding_dimension()
+            )
+        
+        # paper_id / content_type of every chunk, so filtered gets fetch by id instead of scanning metadata
+        self.payload_index = PayloadIndex(os.path.join(persist_directory, f"{collection_name}_payload.sqlite"))
         
         # Get or create collection
         self.collection = self._get_or_create_collection()
@@ -49,81 +328,268 @@ class VectorStore:
             return collection
         except Exception:
             logger.info(f"Creating new collection: {self.collection_name}")
-            return self.client.create_collection(
-                name=self.collection_name,
-                metadata={"description": "Open RAG Benchmark papers collection"}
-            )
+            # Cosine space: distances are 1 - cos of the normalized embeddings, same as the int8 index
+            metadata = {
+                "description": "Open RAG Benchmark papers collection",
+                "hnsw:space": "cosine",
+                "hnsw:num_threads": os.cpu_count() or 1,
+                **{f"hnsw:{key}": value for key, value in self.hnsw_params.items()}
+            }
+            return self.client.create_collection(name=self.collection_name, metadata=metadata)
     
-    def add_documents(self, documents: List[Document]) -> None:
+    def configure_hnsw_params(self) -> Dict[str, int]:
         """
-        Adds documents to vector storage
+        Re-tunes search_ef for the current collection size (call after a bulk load), never below
+        the configured one. M and construction_ef are fixed once the graph is built; a mismatch is only logged.
         """
-        if not documents:
-            logger.warning("No documents to add")
+        params = hnsw_params_for(self.collection.count())
+        params["search_ef"] = max(params["search_ef"], self.hnsw_params.get("search_ef", 0))
+        metadata = dict(self.collection.metadata or {})
+        built = {key: metadata.get(f"hnsw:{key}") for key in ("M", "construction_ef")}
+        if any(value is not None and value < params[key] for key, value in built.items()):
+            logger.info(f"HNSW graph built with {built}; {params} suggested for this size, reset to rebuild")
+        if metadata.get("hnsw:search_ef") != params["search_ef"]:
+            metadata["hnsw:search_ef"] = params["search_ef"]
+            # modify replaces the whole metadata and rejects any hnsw:space key, even an unchanged one
+            metadata.pop("hnsw:space", None)
+            try:
+                self.collection.modify(metadata=metadata)
+                self._set_segment_search_ef(params["search_ef"])
+            except Exception as e:
+                logger.warning(f"Could not update HNSW search_ef: {e}")
+        return params
+    
+    def _set_segment_search_ef(self, search_ef: int) -> None:
+        """
+        Chroma 0.4 HNSW segments read search_ef from their own metadata, copied from the collection's
+        at creation; update it there too, so the index uses it from its next open. This goes through
+        the private sysdb of an in-process client, so other versions and clients are only logged
+        """
+        sysdb = getattr(getattr(self.client, "_server", None), "_sysdb", None)
+        if not chromadb.__version__.startswith(SEGMENT_METADATA_CHROMA) or sysdb is None:
+            logger.warning(f"Chroma {chromadb.__version__} {type(self.client).__name__}: HNSW segments not updated, "
+                           f"search_ef {search_ef} applies to indexes built from now on")
             return
-        
-        # Prepare data for ChromaDB
-        ids = []
-        texts = []
-        metadatas = []
-        
-        for doc in documents:
-            chunk_id = doc.metadata.get("chunk_id", f"chunk_{len(ids)}")
-            ids.append(chunk_id)
-            texts.append(doc.page_content)
-            
-            # Clean metadata for ChromaDB (remove complex types)
-            clean_metadata = {}
-            for key, value in doc.metadata.items():
-                if isinstance(value, (str, int, float, bool)):
-                    clean_metadata[key] = value
-                else:
-                    clean_metadata[key] = str(value)
-            
-            metadatas.append(clean_metadata)
-        
-        # Add to collection
-        try:
-            self.collection.add(
-                ids=ids,
-                documents=texts,
-                metadatas=metadatas
+        for segment in sysdb.get_segments(collection=self.collection.id, scope=SegmentScope.VECTOR):
+            sysdb.update_segment(segment["id"], metadata={"hnsw:search_ef": search_ef})
+    
+    def finalize_load(self) -> None:
+        """Index maintenance after a bulk load"""
+        self.configure_hnsw_params()
+    
+    def count(self) -> int:
+        """Number of stored chunks"""
+        return self.collection.count()
+    
+    def existing_ids(self, ids: List[str]) -> Set[str]:
+        """Those of ids already stored"""
+        # get() rejects repeated ids as add() does
+        return set(self.collection.get(ids=list(dict.fromkeys(ids)), include=[])['ids'])
+    
+    def stored_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Metadata of those of ids already stored, by id"""
+        results = self.collection.get(ids=list(dict.fromkeys(ids)), include=["metadatas"])
+        return dict(zip(results['ids'], results['metadatas']))
+    
+    def add_paper_aliases(self, aliases: Dict[str, List[str]]) -> None:
+        """
+        Adds paper_ids to the alias_paper_ids of stored chunks with the same content, so
+        get_documents_by_paper_id finds them for those papers too
+        """
+        if not aliases:
+            return
+        with self._write_lock:
+            updates = self._merge_aliases(self.stored_metadatas(list(aliases)), aliases)
+            if not updates:
+                return
+            self.collection.update(
+                ids=list(updates), metadatas=[{"alias_paper_ids": ", ".join(ids)} for ids in updates.values()]
             )
-            logger.info(f"Added {len(documents)} documents to collection")
+            self.payload_index.add_aliases([(chunk_id, paper_id) for chunk_id, ids in updates.items() for paper_id in ids])
+    
+    def _write(self, batch: ChunkBatch, embeddings: Optional[np.ndarray], batch_size: Optional[int]) -> None:
+        """
+        Adds a prepared batch (embedded by Chroma when embeddings is None).
+        Embeddings stay one fp32 array; only the slab being added is converted to Python lists.
+        """
+        # Chroma rejects adds above the client's max_batch_size
+        max_batch = getattr(self.client, "max_batch_size", len(batch)) or len(batch)
+        batch_size = min(batch_size or len(batch), max_batch)
+        try:
+            with self._write_lock:
+                for start in range(0, len(batch), batch_size):
+                    end = start + batch_size
+                    self.collection.add(
+                        ids=batch.ids[start:end],
+                        embeddings=embeddings[start:end].tolist() if embeddings is not None else None,
+                        documents=batch.texts[start:end],
+                        metadatas=batch.metadatas[start:end]
+                    )
+                self.payload_index.add(batch.ids, batch.metadatas)
+            logger.info(f"Added {len(batch)} documents to collection")
+            if self.int8_index is not None and embeddings is not None:
+                self.add_quantized(batch, *quantize(embeddings))
         except Exception as e:
             logger.error(f"Error adding documents: {e}")
             raise
     
+    def add_quantized(self, batch: ChunkBatch, codes, scales) -> None:
+        """
+        Stores int8 codes and per-vector scales of an already added batch in the int8 index
+        """
+        if self.int8_index is None:
+            raise ValueError("Vector store was created without int8 quantization")
+        self.int8_index.add(batch.ids, codes, scales, [m.get("content_type") for m in batch.metadatas])
+    
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Merges metadatas into existing rows (keys not given are kept)
+        """
+        with self._write_lock:
+            self.collection.update(ids=ids, metadatas=metadatas)
+    
     def search(self, 
                query: str, 
                n_results: int = 5,
-               where: Optional[Dict] = None) -> List[Dict[str, Any]]:
+               where: Optional[Dict] = None,
+               query_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
         """
-        Performs search in vector storage
+        Performs search in vector storage; query_embedding skips encoding the query.
+        Errors propagate, callers handle them once per user query.
         """
-        try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results,
-                where=where
-            )
-            
-            # Convert results to convenient format
-            search_results = []
-            if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    search_results.append({
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i],
-                        'distance': results['distances'][0][i] if results['distances'] else None,
-                        'id': results['ids'][0][i]
-                    })
-            
-            return search_results
-            
-        except Exception as e:
-            logger.error(f"Search error: {e}")
+        # Encoded here rather than by Chroma's embedding function, same model and batching as search_batch
+        if query_embedding is None:
+            query_embedding = self.embed_query(query).tolist()
+        
+        usable, content_type = self._int8_filter(where)
+        if usable:
+            return self._fetch_hits(self.int8_index.search([query_embedding], n_results, content_type)[0])
+        
+        return self._query_collection([query_embedding], n_results, where)[0]
+    
+    def search_batch(self, 
+                     queries: List[str], 
+                     n_results: int = 5,
+                     wheres: Optional[List[Optional[Dict]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Performs several searches with one embedding pass.
+        wheres[i] is the filter for queries[i]; queries sharing a filter go in one Chroma query.
+        """
+        if not queries:
+            return []
+        wheres = wheres or [None] * len(queries)
+        
+        embeddings = self._encode(queries).astype(np.float32).tolist()
+        
+        # Group query positions by filter (dicts are unhashable, key by repr)
+        groups: Dict[str, List[int]] = {}
+        for i, where in enumerate(wheres):
+            groups.setdefault(repr(where), []).append(i)
+        
+        all_results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for positions in groups.values():
+            usable, content_type = self._int8_filter(wheres[positions[0]])
+            if usable:
+                hits = self.int8_index.search([embeddings[i] for i in positions], n_results, content_type)
+                for i, row_hits in zip(positions, hits):
+                    all_results[i] = self._fetch_hits(row_hits)
+                continue
+            group_results = self._query_collection([embeddings[i] for i in positions], n_results, wheres[positions[0]])
+            for i, results in zip(positions, group_results):
+                all_results[i] = results
+        
+        return all_results
+    
+    def _query_collection(self, query_embeddings: List[List[float]], n_results: int,
+                          where: Optional[Dict]) -> List[List[Dict[str, Any]]]:
+        """
+        Chroma query, one result list per embedding. With rerank_candidates > n_results, that many
+        approximate HNSW hits are fetched with their vectors and the top n_results by exact cosine kept.
+        """
+        if self.rerank_candidates <= n_results:
+            results = self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+            return [self._format_query_results(results, row) for row in range(len(query_embeddings))]
+        
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=self.rerank_candidates,
+            where=where,
+            include=["documents", "metadatas", "embeddings"]
+        )
+        reranked = []
+        for row, query_embedding in enumerate(query_embeddings):
+            if not results['ids'][row]:
+                reranked.append([])
+                continue
+            candidates = np.asarray(results['embeddings'][row], dtype=np.float32)
+            similarities = _cosine_similarities(np.asarray(query_embedding, dtype=np.float32), candidates)
+            order = np.argsort(-similarities, kind="stable")[:n_results]
+            reranked.append([
+                {
+                    'content': results['documents'][row][j],
+                    'metadata': results['metadatas'][row][j],
+                    'distance': 1.0 - float(similarities[j]), # cosine distance
+                    'id': results['ids'][row][j]
+                }
+                for j in order
+            ])
+        return reranked
+    
+    def _int8_filter(self, where: Optional[Dict]) -> Tuple[bool, Optional[str]]:
+        """Whether the int8 index can serve `where` (none or a content_type equality), and that content_type"""
+        if self.int8_index is None or not len(self.int8_index):
+            return False, None
+        if where is None:
+            return True, None
+        if list(where) == ["content_type"]:
+            value = where["content_type"]
+            if isinstance(value, dict) and list(value) == ["$eq"]:
+                value = value["$eq"]
+            if isinstance(value, str):
+                return True, value
+        return False, None
+    
+    def _fetch_hits(self, hits: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+        """Fetches documents and metadatas of int8 hits from Chroma, keeping hit order"""
+        if not hits:
             return []
+        results = self.collection.get(ids=[chunk_id for chunk_id, _ in hits], include=["documents", "metadatas"])
+        rows = {chunk_id: i for i, chunk_id in enumerate(results['ids'])}
+        search_results = []
+        for chunk_id, similarity in hits:
+            i = rows.get(chunk_id)
+            if i is None:
+                continue
+            search_results.append({
+                'content': results['documents'][i],
+                'metadata': results['metadatas'][i],
+                'distance': 1.0 - similarity, # cosine distance
+                'id': chunk_id
+            })
+        return search_results
+    
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], row: int) -> List[Dict[str, Any]]:
+        """Converts row `row` of a Chroma query response to convenient format"""
+        if not results['documents'] or not results['documents'][row]:
+            return []
+        documents = results['documents'][row]
+        distances = results['distances'][row] if results['distances'] else [None] * len(documents)
+        return [
+            {'content': content, 'metadata': metadata, 'distance': distance, 'id': chunk_id}
+            for content, metadata, distance, chunk_id
+            in zip(documents, results['metadatas'][row], distances, results['ids'][row])
+        ]
+    
+    @staticmethod
+    def _format_get_results(results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Converts a Chroma get response to convenient format"""
+        if not results['documents']:
+            return []
+        return [
+            {'content': content, 'metadata': metadata, 'id': chunk_id}
+            for content, metadata, chunk_id in zip(results['documents'], results['metadatas'], results['ids'])
+        ]
     
     def get_collection_info(self) -> Dict[str, Any]:
         """
@@ -147,6 +613,9 @@ class VectorStore:
         """
         try:
             self.client.delete_collection(name=self.collection_name)
+            if self.int8_index is not None:
+                self.int8_index.reset()
+            self.payload_index.reset()
             logger.info(f"Collection {self.collection_name} deleted")
         except Exception as e:
             logger.error(f"Error deleting collection: {e}")
@@ -159,50 +628,34 @@ class VectorStore:
         self.collection = self._get_or_create_collection()
         logger.info(f"Collection {self.collection_name} reset")
     
-    def get_documents_by_paper_id(self, paper_id: str) -> List[Dict[str, Any]]:
-        """
-        Gets all documents by paper ID
-        """
-        try:
-            results = self.collection.get(
-                where={"paper_id": paper_id}
-            )
-            
-            documents = []
-            if results['documents']:
-                for i in range(len(results['documents'])):
-                    documents.append({
-                        'content': results['documents'][i],
-                        'metadata': results['metadatas'][i],
-                        'id': results['ids'][i]
-                    })
-            
-            return documents
-            
-        except Exception as e:
-            logger.error(f"Error getting documents by paper_id: {e}")
-            return []
+    def _payload_covers_collection(self) -> bool:
+        """False for collections filled before the payload index existed"""
+        return len(self.payload_index) == self.collection.count()
     
-    def get_documents_by_content_type(self, content_type: str) -> List[Dict[str, Any]]:
+    def _get_where(self, field: str, value: str) -> List[Dict[str, Any]]:
+        """collection.get(where={field: value}), by ids from the payload index when it is complete"""
+        if self._payload_covers_collection():
+            ids = self.payload_index.ids_where(field, value)
+            if not ids:
+                return []
+            return self._format_get_results(self.collection.get(ids=ids))
+        return self._format_get_results(self.collection.get(where={field: value}))
+    
+    def count_by_content_type(self, content_type: str) -> int:
         """
-        Gets documents by content type
+        Counts documents of given content type without fetching their contents
         """
         try:
+            if self._payload_covers_collection():
+                return self.payload_index.count_where("content_type", content_type)
+            
+            # Chroma 0.4 count() takes no filter; get() with include=[] returns only ids
             results = self.collection.get(
-                where={"content_type": content_type}
+                where={"content_type": {"$eq": content_type}},
+                include=[]
             )
-            
-            documents = []
-            if results['documents']:
-                for i in range(len(results['documents'])):
-                    documents.append({
-                        'content': results['documents'][i],
-                        'metadata': results['metadatas'][i],
-                        'id': results['ids'][i]
-                    })
-            
-            return documents
+            return len(results['ids'])
             
         except Exception as e:
-            logger.error(f"Error getting documents by content_type: {e}")
-            return []
+            logger.error(f"Error counting documents by content_type: {e}")
+            return 0